@@ -1,6 +1,7 @@
 '''Class for configs.'''
 
 from os import path
+from functools import lru_cache
 from typing import NamedTuple, FrozenSet, Dict, Optional, List
 
 import glog
@@ -74,7 +75,16 @@ class Config(NamedTuple):
 
     @classmethod
     def load_from_file(cls, filepath: str) -> 'Config':
-        '''Load Config from a yaml file.'''
+        '''Load Config from a yaml file.
+
+        Cached by file mtime, Configs are immutable so the same instance is safely shared.
+        '''
+        assert path.exists(filepath), f'File not found: {filepath}'
+        return cls._load_from_file(filepath, path.getmtime(filepath))
+
+    @classmethod
+    @lru_cache(maxsize=16)
+    def _load_from_file(cls, filepath: str, mtime: float) -> 'Config':
         config_data = utils.load_yaml(filepath)
         assert 'config' in config_data, 'Loaded data does not have highest-level config field'
         
@@ -1,15 +1,22 @@
 '''Dataclass for storing addresses.'''
 
 from dataclasses import dataclass, asdict
-from typing import Optional, Dict
+from functools import lru_cache, cached_property
+from typing import Optional, Dict, Tuple
 import json
 from os import path
 
 import usaddress
 import glog
+try:
+    import us_addrs  # Optional compiled port of usaddress, same tag labels but much faster.
+except ImportError:
+    us_addrs = None
 
+ADDRESS_REQUIRED_FIELDS = frozenset({'AddressNumber', 'StreetName', 'StreetNamePostType', 'PlaceName', 'StateName', 'ZipCode'})
 
-@dataclass
+
+@dataclass(frozen=True)
 class Address:
     SERIALIZATION_ELEMENT_FIELDS = [
         'unit_num',
@@ -19,6 +26,7 @@ class Address:
         'zipcode'
     ]
     SERIALIZATION_DELIMITER = '~'  # Cannot be dash or underscore as these are used in actual addresses
+    ID_DELIMITER = '-'
     GOOGLE_MAPS_BASE_URL = 'https://www.google.com/maps/place/'
     MISSING_ELEMENT_ERROR_REGEX = 'address string missing required element'
 
@@ -36,6 +44,13 @@ class Address:
         element_values = [value for value in element_values if value is not None]
         return self.SERIALIZATION_DELIMITER.join(element_values).lower()
 
+    @cached_property
+    def id(self) -> str:
+        '''URL-safe unique ID, computed once per Address since instances are immutable.'''
+        element_values = [getattr(self, field) for field in self.SERIALIZATION_ELEMENT_FIELDS]
+        element_values = [value for value in element_values if value is not None]
+        return self.ID_DELIMITER.join(element_values).replace(' ', self.ID_DELIMITER).lower()
+
     def to_display_string(self) -> str:
         return f'#{self.unit_num} {self.short_address}, {self.zipcode}'
 
@@ -69,32 +84,75 @@ class Address:
     @staticmethod
     def from_full_address(full_address: str) -> 'Address':
         '''Parse Address from full address string.'''
+        short_address, city, state, zipcode, unit_num = _parse_full_address(full_address)
+        return Address(
+            short_address=short_address,
+            city=city,
+            state=state,
+            zipcode=zipcode,
+            unit_num=unit_num
+        )
 
-        def _validate_parsed_address_info(address_info: Dict, full_address: str) -> None:
-            '''Validate parsed usaddress included all needed info.'''
-            REQUIRED_FIELDS = ['AddressNumber', 'StreetName', 'StreetNamePostType', 'PlaceName', 'StateName', 'ZipCode']
-            for field in REQUIRED_FIELDS:
-                assert field in address_info, f'address string missing required element ({field}): {full_address} {address_info}'
 
+@lru_cache(maxsize=4096)
+def _parse_full_address(full_address: str) -> Tuple[str, str, str, str, Optional[str]]:
+    '''Parse full address string into Address fields.
 
-        address_info, _ = usaddress.tag(full_address)
-        _validate_parsed_address_info(address_info, full_address)
-        
-        short_address_elements = [
-            address_info.get('AddressNumber'),
-            address_info.get('StreetNamePreDirectional'),
-            address_info.get('StreetName'),
-            address_info.get('StreetNamePostType')
-        ]
-        short_address_elements = [element for element in short_address_elements if element is not None]
-        short_address = ' '.join(short_address_elements)
+    Cached since usaddress's CRF tagger is slow and the same addresses are re-parsed across
+    search results, listings and repeated scrapes. Returns a plain tuple rather than an Address
+    so cached values carry no per-instance state, like the cached id.
+    '''
 
-        unit_num = address_info.get('OccupancyIdentifier')
+    def _validate_parsed_address_info(address_info: Dict, full_address: str) -> None:
+        '''Validate parsed usaddress included all needed info.'''
+        missing_fields = ADDRESS_REQUIRED_FIELDS.difference(address_info)
+        assert not missing_fields, f'address string missing required element ({", ".join(sorted(missing_fields))}): {full_address} {address_info}'
 
-        return Address(
-            short_address=short_address,
-            city=address_info['PlaceName'],
-            state=address_info['StateName'],
-            zipcode=address_info['ZipCode'],
-            unit_num=unit_num
-        )
\ No newline at end of file
+
+    # Prefer compiled parser when installed, fall back to usaddress if it's unavailable or its result is unusable.
+    address_info = _tag_address_compiled(full_address)
+    if address_info is None or not ADDRESS_REQUIRED_FIELDS.issubset(address_info):
+        address_info, _ = usaddress.tag(full_address)
+    _validate_parsed_address_info(address_info, full_address)
+    
+    short_address_elements = [
+        address_info.get('AddressNumber'),
+        address_info.get('StreetNamePreDirectional'),
+        address_info.get('StreetName'),
+        address_info.get('StreetNamePostType')
+    ]
+    short_address_elements = [element for element in short_address_elements if element is not None]
+    short_address = ' '.join(short_address_elements)
+
+    unit_num = address_info.get('OccupancyIdentifier')
+
+    return (
+        short_address,
+        address_info['PlaceName'],
+        address_info['StateName'],
+        address_info['ZipCode'],
+        unit_num
+    )
+
+
+def _tag_address_compiled(full_address: str) -> Optional[Dict[str, str]]:
+    '''Tag address with us_addrs, merging tokens into the same label -> component dict as usaddress.tag().
+
+    Return: tagged address, or None if us_addrs isn't installed or a label repeats non-consecutively
+        (usaddress.tag() raises RepeatedLabelError for these, so defer to it).
+    '''
+    if us_addrs is None:
+        return None
+
+    tokens_by_label = {}
+    last_label = None
+    for token, label in us_addrs.parse(full_address):
+        if label == last_label:
+            tokens_by_label[label].append(token)
+        elif label not in tokens_by_label:
+            tokens_by_label[label] = [token]
+        else:
+            return None
+        last_label = label
+
+    return {label: ' '.join(tokens).strip(' ,;') for label, tokens in tokens_by_label.items()}
\ No newline at end of file
@@ -9,11 +9,14 @@ import yaml
 
 DB_DRIVER_NAME = 'postgresql'
 DB_KEYFILE_PATH = '/etc/keys/postgres.yaml'
+# Connection pool defaults (sqlalchemy's), clients used from many threads at once should size their own.
+DB_POOL_SIZE = 5
+DB_MAX_OVERFLOW = 10
 
 class DbClient:
     '''Client for interacting with the DB.'''
 
-    def __init__(self, keyfile_path: str = DB_KEYFILE_PATH):
+    def __init__(self, keyfile_path: str = DB_KEYFILE_PATH, pool_size: int = DB_POOL_SIZE, max_overflow: int = DB_MAX_OVERFLOW):
         with open(keyfile_path, 'r') as file:
             try:
                 db_config = yaml.safe_load(file)
@@ -25,7 +28,11 @@ class DbClient:
                     port=db_config['port'],
                     database=db_config['db']
                 )
-                self.engine = create_engine(db_url)
+                self.engine = create_engine(
+                    db_url,
+                    pool_size=pool_size,
+                    max_overflow=max_overflow,
+                )
             except Exception as e:
                 raise RuntimeError(f'Error connecting to postgres') from e
 
@@ -2,23 +2,31 @@
 
 from os import path
 from functools import lru_cache
-from typing import List, Dict, Optional, Tuple
-import json
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple, Union, Iterator
+import queue
 import re
 import traceback
 
-from bs4 import BeautifulSoup, Tag
+from bs4 import BeautifulSoup, SoupStrainer, Tag
 import glog
-import usaddress
 
 from housing.configs import config
 from housing.data.address import Address
 from housing.data.schema import Unit, Listing, Request
-from housing.scrapers import scraper, schema_dot_org
+from housing.scrapers import scraper, schema_dot_org, apartments_dot_com_parsing
 
 BASE_URL = 'https://www.apartments.com/'
+_ZIPCODE_SEARCH_DONE = object()  # Queued by each zipcode search when it finishes.
 
 
+def _classes_regex(classes: List[str]) -> re.Pattern:
+    '''Compile class names into one anchored regex, bs4 matches it against each of a tag's classes.'''
+    return re.compile('^(?:' + '|'.join(re.escape(class_name) for class_name in classes) + ')$')
+
+
+@dataclass(frozen=True, slots=True)
 class ApartmentsDotComSearchResult(scraper.SearchResult):
     '''Output from Apartments.com search results page.
     
@@ -34,31 +42,12 @@ class ApartmentsDotComSearchResult(scraper.SearchResult):
     max_bedrooms: config.BedroomCount
 
 
-    def __new__(cls, id, url, address, min_price, max_price, min_bedrooms, max_bedrooms):
-        '''Cannot use NamedTuple in chained inheritance unless you override __new__() in the children.'''
-        self = super(ApartmentsDotComSearchResult, cls).__new__(cls, id, url, address)
-        self.min_price = min_price
-        self.max_price = max_price
-        self.min_bedrooms = min_bedrooms
-        self.max_bedrooms = max_bedrooms
-        return self
-
-
-    def _asdict(self) -> Dict:
-        '''Due to NamedTuple inheritance complexities also have to override this.'''
-        result = super()._asdict()
-        result['min_price'] = self.min_price
-        result['max_price'] = self.max_price
-        result['min_bedrooms'] = self.min_bedrooms
-        result['max_bedrooms'] = self.max_bedrooms
-        return result
-
-
 class ApartmentsDotCom(scraper.Scraper):
     '''Apartments.com scraper.'''
 
     SOURCE = 'apartments.com'
     USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/105.0.0.0 Safari/537.36'
+    ACCEPT_ENCODING = 'gzip, deflate'  # Only encodings requests can decode without optional deps (e.g. brotli).
 
     # Search result scraping params.
     DATA_BLOCK_TYPE = 'application/ld+json'
@@ -70,48 +59,28 @@ class ApartmentsDotCom(scraper.Scraper):
     SEARCH_RESULT_ADDRESS_CLASSES_FALLBACK = ['property-title', 'property-address']
     SEARCH_RESULT_PRICING_CLASSES = ['property-pricing', 'property-rents', 'price-range']
     SEARCH_RESULT_BEDROOMS_CLASSES = ['property-beds', 'bed-range']
+    SEARCH_RESULT_ADDRESS_CLASSES_REGEX = _classes_regex(SEARCH_RESULT_ADDRESS_CLASSES)
+    SEARCH_RESULT_ADDRESS_CLASSES_FALLBACK_REGEX = _classes_regex(SEARCH_RESULT_ADDRESS_CLASSES_FALLBACK)
+    SEARCH_RESULT_PRICING_CLASSES_REGEX = _classes_regex(SEARCH_RESULT_PRICING_CLASSES)
+    SEARCH_RESULT_BEDROOMS_CLASSES_REGEX = _classes_regex(SEARCH_RESULT_BEDROOMS_CLASSES)
     PAGE_COUNT_CLASS = 'pageRange'
     DEFAULT_NUM_PAGES = 1
-    UNPARSEABLE_PRICE_STRS = ['callforrent']
-
-    # Listing scraping params: multi-listing search results.
-    ALL_UNITS_TAB_ATTRIBUTE_NAME = 'data-tab-content-id'
-    ALL_UNITS_TAB_ATTRIBUTE_VALUE = 'all'
-    UNIT_TYPE_CLASS = 'hasUnitGrid'
-    UNIT_TYPE_METADATA_CONTAINER_CLASS = 'priceGridModelWrapper'
-    UNIT_TYPE_ID_ATTRIBUTE = 'data-rentalkey'
-    UNIT_TYPE_METADATA_CLASS = 'detailsTextWrapper'
-    UNIT_TYPE_LISTINGS_CLASS = 'unitContainer'
-
-    # Listing scraping params: single-listing search result.
-    LISTING_FULL_CONTENT_CLASS = 'profileContent'
-    LISTING_ADDRESS_HEADING_CLASS = 'propertyNameRow'
-    LISTING_ADDRESS_SUBHEADING_CLASS = 'propertyAddressRow'
-    LISTING_NEIGHBORHOOD_CLASS = 'neighborhoodAddress'
-    LISTING_DETAILS_CELL_CLASS = 'priceBedRangeInfoInnerContainer'
-    LISTING_DETAILS_CELL_LABEL_PRICE = 'Monthly Rent'
-    LISTING_DETAILS_CELL_LABEL_BEDROOMS = 'Bedrooms'
-    LISTING_DETAILS_CELL_LABEL_BATHROOMS = 'Bathrooms'
-    LISTING_DETAILS_CELL_LABEL_SQFT = 'Square Feet'
-
-
-    # Generic listing scraping params.
-    LISTING_UNIT_NUM_CLASS = 'unitColumn'
-    LISTING_PRICE_CLASS = 'pricingColumn'
-    LISTING_SQFT_CLASS = 'sqftColumn'
-    LISTING_YES_PETS_PHRASES = ['pet friendly']
-    LISTING_NO_PETS_PHRASES = ['no pets']
-    LISTING_YES_PARKING_PHRASES = [
-        'parking included',
-        'assigned parking',
-        'unassigned parking',
-        'parking available'
-    ]
-    LISTING_NO_PARKING_PHRASES = []
+    # Fast-path for the common '<number> [<directional>] <name> <type>, <city>, <state> <zipcode>' address format.
+    # Its short address becomes Unit.address_str, so it's deliberately strict and only accepts addresses usaddress
+    # would parse identically - anything else (multi-word street names and their pre-modifiers, unit numbers,
+    # post-directionals, zip+4, punctuation, building names) falls back to usaddress.
+    # Parity with usaddress is checked by scrapers/scripts/fast_address_parity.py, re-run it after changing these.
+    FAST_ADDRESS_REGEX = re.compile(
+        r'^(?P<short_address>\d+ (?:(?P<pre_directional>[NSEW]|NE|NW|SE|SW) )?(?P<street_name>\d*[A-Za-z]+) (?P<street_type>[A-Za-z]+)), '
+        r'?(?P<city>[A-Za-z]+(?: [A-Za-z]+)*), ?(?P<state>[A-Z]{2}) (?P<zipcode>\d{5})$'
+    )
+    FAST_ADDRESS_STREET_TYPES = frozenset(['st', 'ave', 'rd', 'blvd', 'way', 'dr', 'pl', 'ct', 'ln', 'ter', 'pkwy', 'hwy', 'cir'])
+    FAST_ADDRESS_DIRECTIONALS = frozenset(['n', 's', 'e', 'w', 'ne', 'nw', 'se', 'sw'])
+    # Street name or city tokens usaddress could tag as another address part, e.g. 'Federal Way, WA'.
+    FAST_ADDRESS_AMBIGUOUS_TOKENS = FAST_ADDRESS_STREET_TYPES | FAST_ADDRESS_DIRECTIONALS
 
 
     @classmethod
-    @lru_cache(maxsize=100)
     def _get_search_url(
         cls, 
         params: config.ScrapingParams, 
@@ -122,6 +91,28 @@ class ApartmentsDotCom(scraper.Scraper):
         
         Must specify zipcode b/c ScrapingParams has multiple.
         '''
+        return cls._build_search_url(
+            min_bedrooms=params.min_bedrooms,
+            max_bedrooms=params.max_bedrooms,
+            min_price=params.min_price,
+            max_price=params.max_price,
+            zipcode=zipcode,
+            page=page
+        )
+
+
+    @classmethod
+    @lru_cache(maxsize=None)  # Bounded by unique search ranges x zipcodes x pages.
+    def _build_search_url(
+        cls,
+        min_bedrooms: config.BedroomCount,
+        max_bedrooms: config.BedroomCount,
+        min_price: int,
+        max_price: int,
+        zipcode: str,
+        page: int
+    ) -> str:
+        '''Cached search url generation, keyed only on the scalar params the url actually depends on.'''
         
         # Get location clause.
         zipcode_info = cls.get_zipcode_info(zipcode)
@@ -129,14 +120,14 @@ class ApartmentsDotCom(scraper.Scraper):
         location_str = location_str.replace(' ', '-').lower()
 
         # Get bedrooms clause.
-        bedrooms_clause = f'{params.min_bedrooms}-bedrooms' \
-            if params.min_bedrooms == params.max_bedrooms \
-            else f'{params.min_bedrooms}-to-{params.max_bedrooms}-bedrooms'
+        bedrooms_clause = f'{min_bedrooms}-bedrooms' \
+            if min_bedrooms == max_bedrooms \
+            else f'{min_bedrooms}-to-{max_bedrooms}-bedrooms'
 
         # Get price clause.
-        price_clause = f'{params.min_price}-to-{params.max_price}' \
-            if params.min_price > 0 \
-            else f'under-{params.max_price}'
+        price_clause = f'{min_price}-to-{max_price}' \
+            if min_price > 0 \
+            else f'under-{max_price}'
 
         # Get pagination clause
         pagination_clause = str(page) if page > 1 else ''
@@ -149,10 +140,15 @@ class ApartmentsDotCom(scraper.Scraper):
 
 
     @classmethod
-    def get_url(cls, url: str, method: str = 'GET') -> Tuple[BeautifulSoup, Request]:
+    def get_url(cls, url: str, method: str = 'GET',
+        parser: Optional[str] = scraper.Scraper.PARSER_HTML,
+        strainer: Optional[SoupStrainer] = None) -> Tuple[Union[BeautifulSoup, str, Dict, List], Request]:
         '''Customize request to get past server scraping filters.'''
-        headers = {'user-agent': cls.USER_AGENT}
-        return super().get_url(url, method, headers=headers)
+        headers = {
+            'user-agent': cls.USER_AGENT,
+            'accept-encoding': cls.ACCEPT_ENCODING,
+        }
+        return super().get_url(url, method, headers=headers, parser=parser, strainer=strainer)
 
 
     @classmethod
@@ -172,19 +168,48 @@ class ApartmentsDotCom(scraper.Scraper):
 
 
     @classmethod
-    def _sanitize_string(cls, input: str) -> str:
-        '''Remove any newlines, consecutive spaces, etc.'''
-        result = input
-        result = re.sub('\n|\r', ' ', result)  # Cleanup address newlines, tabs.
-        result = re.sub(' {2,}', ' ', result).strip()  # Cleanup spaces.
-        return result
+    def _fast_parse_address(cls, full_address_str: str) -> Optional[Address]:
+        '''Regex-based address parsing for apartments.com's common format, skips usaddress's CRF tagger.
+
+        Expects an already sanitized address string, anything irregular just won't match.
+
+        Return: Address if the fast-path format matched, None otherwise.
+        '''
+        match = cls.FAST_ADDRESS_REGEX.match(full_address_str)
+        if match is None:
+            return None
+
+        if match.group('street_type').lower() not in cls.FAST_ADDRESS_STREET_TYPES:
+            return None
+        city_tokens = match.group('city').lower().split(' ')
+        if match.group('street_name').lower() in cls.FAST_ADDRESS_AMBIGUOUS_TOKENS or \
+            not cls.FAST_ADDRESS_AMBIGUOUS_TOKENS.isdisjoint(city_tokens):
+            return None
+
+        return Address(
+            short_address=match.group('short_address'),
+            city=match.group('city'),
+            state=match.group('state'),
+            zipcode=match.group('zipcode')
+        )
+
+
+    @classmethod
+    def _join_address_elements(cls, address_elements: List[Tag]) -> str:
+        '''Full address string from the text of multiple elements.'''
+        return apartments_dot_com_parsing.sanitize_string(' '.join(element.get_text(' ', strip=True) for element in address_elements))
 
 
     @classmethod
     def _parse_address_from_elements(cls, address_elements: List[Tag]) -> Address:
         '''Helper for parsing address from the text combination from multiple elements.'''
         assert len(address_elements) > 0, 'could not find address element'
-        full_address_str = ' '.join([element.text for element in address_elements])
+        full_address_str = cls._join_address_elements(address_elements)
+        
+        address = cls._fast_parse_address(full_address_str)
+        if address is not None:
+            return address
+        
         try:
             address = Address.from_full_address(full_address_str)
         except AssertionError as e:
@@ -193,114 +218,6 @@ class ApartmentsDotCom(scraper.Scraper):
         return address
 
     
-    @classmethod
-    def _parse_bedrooms(cls, bedrooms_str: str) -> config.BedroomCount:
-        """Parse the number of bedrooms from a formatted string."""
-        
-        assert '-' not in bedrooms_str, 'Found "-", must split string before passing to _parse_bedrooms()'
-        
-        bedrooms_str = bedrooms_str.lower()
-        bedrooms_str = re.sub('b(e)?d(s)?', '', bedrooms_str)
-        bedrooms_str = bedrooms_str.replace(' ', '')
-        bedrooms_str = bedrooms_str.split(',')[0]
-        bedrooms_str = bedrooms_str.replace('studio', '0')
-        
-        return int(bedrooms_str)
-
-    
-    @classmethod
-    def _parse_bathrooms(cls, bathrooms_str: str) -> float:
-        """Helper for parsing number of bathrooms from apartments.com formatted string."""
-        assert '-' not in bathrooms_str, 'Found "-", must split string before passing to _parse_bathrooms()'
-        
-        bathrooms_str = re.sub('ba(th)?(s)?', '', bathrooms_str)
-
-        return float(bathrooms_str)
-
-
-    @classmethod
-    def _parse_sqft(cls, sqft_str: str) -> Optional[int]:
-        """Helper for parsing square footage from apartments.com formatted string."""
-        assert '-' not in sqft_str, 'Found "-", must split string before passing to _parse_sqft()'
-
-        sqft_str = sqft_str.replace('square feet', '')  # Sometimes included in html for screenreaders only
-        sqft_str = re.sub('sq ft', '', sqft_str)
-        sqft_str = sqft_str.replace(',', '')
-
-        result = None
-        if sqft_str:
-            result = int(sqft_str)
-        
-        return result
-
-    
-    @classmethod
-    def _parse_pets_allowed(cls, input_text) -> Optional[bool]:
-        """Helper for attempting to parse pet policy from apartments.com listing text.
-        
-        Return: true/false if policy found, None otherwise
-        """
-        input_text = input_text.lower()
-        result = None
-        if any(phrase in input_text for phrase in cls.LISTING_YES_PETS_PHRASES):
-            result = True
-        elif any(phrase in input_text for phrase in cls.LISTING_NO_PETS_PHRASES):
-            result = False
-        
-        return result
-
-
-    @classmethod
-    def _parse_parking_available(cls, input_text) -> Optional[bool]:
-        """Helper for attempting to parse parking availability from apartments.com listing text.
-        
-        Return: true/false if parking availability found, None otherwise
-        """
-        input_text = input_text.lower()
-        result = None
-        if any(phrase in input_text for phrase in cls.LISTING_YES_PARKING_PHRASES):
-            result = True
-        elif any(phrase in input_text for phrase in cls.LISTING_NO_PARKING_PHRASES):
-            result = False
-        
-        return result
-
-
-    @classmethod
-    def _parse_price(cls, price_str: str) -> int:
-        """Parse price from a formmatted string."""
-
-        assert '-' not in price_str, 'Found "-", must split string before passing to _parse_price()'
-
-        price_str = price_str.replace('price', '')
-        price_str = price_str.replace('$', '')
-        price_str = price_str.replace(',', '')
-        price_str = price_str.replace(' ', '')
-        price_str = price_str.replace('/mo', '')
-        price_str = price_str.lower()
-
-        if price_str in cls.UNPARSEABLE_PRICE_STRS:
-            raise scraper.KnownParsingError(f'unparseable price string: {price_str}')
-
-        result = None
-        try:
-            result = int(price_str)
-        except ValueError as e:
-            raise scraper.KnownParsingError(e)
-        
-        return result
-
-
-    @classmethod
-    def _parse_unit_num(cls, unit_num_str: str) -> str:
-        """Parse unit_num from a formmated string."""
-
-        unit_num_str = unit_num_str.lower()
-        unit_num_str = unit_num_str.replace('unit', '')
-        unit_num_str = unit_num_str.lstrip().rstrip()
-        return unit_num_str
-
-
     @classmethod
     def _parse_search_result_element(cls, result_element: Tag, search_url: str) -> ApartmentsDotComSearchResult:
         '''Parse search result html.'''
@@ -314,38 +231,38 @@ class ApartmentsDotCom(scraper.Scraper):
             # First try string combination of text from all primary address classes.
             address = None
             try:
-                address_elements = result_element.find_all(class_=cls.SEARCH_RESULT_ADDRESS_CLASSES)
+                address_elements = result_element.find_all(class_=cls.SEARCH_RESULT_ADDRESS_CLASSES_REGEX)
                 address = cls._parse_address_from_elements(address_elements)
             except AssertionError:
                 # Try fallback classes.
-                address_elements = result_element.find_all(class_=cls.SEARCH_RESULT_ADDRESS_CLASSES_FALLBACK)
+                address_elements = result_element.find_all(class_=cls.SEARCH_RESULT_ADDRESS_CLASSES_FALLBACK_REGEX)
                 address = cls._parse_address_from_elements(address_elements)
 
             # Parse price data.
             min_price = None
             max_price = None
-            pricing_element = result_element.find(class_=cls.SEARCH_RESULT_PRICING_CLASSES)
+            pricing_element = result_element.find(class_=cls.SEARCH_RESULT_PRICING_CLASSES_REGEX)
             assert pricing_element is not None, 'could not find pricing element'
             pricing_str = pricing_element.text
             if '-' in pricing_str:
                 min_price_str, max_price_str = pricing_str.split('-')
-                min_price = cls._parse_price(min_price_str)
-                max_price = cls._parse_price(max_price_str)
+                min_price = apartments_dot_com_parsing.parse_price(min_price_str)
+                max_price = apartments_dot_com_parsing.parse_price(max_price_str)
             else:
-                min_price = max_price = cls._parse_price(pricing_str)
+                min_price = max_price = apartments_dot_com_parsing.parse_price(pricing_str)
 
             # Parse bedrooms.
             min_bedrooms = None
             max_bedroomss = None
-            bedrooms_element = result_element.find(class_=cls.SEARCH_RESULT_BEDROOMS_CLASSES)
+            bedrooms_element = result_element.find(class_=cls.SEARCH_RESULT_BEDROOMS_CLASSES_REGEX)
             assert bedrooms_element is not None, 'could not find bedrooms element'
             bedrooms_str = bedrooms_element.text
             if '-' in bedrooms_str:
                 min_bedrooms_str, max_bedrooms_str = bedrooms_str.split('-')
-                min_bedrooms = cls._parse_bedrooms(min_bedrooms_str)
-                max_bedrooms = cls._parse_bedrooms(max_bedrooms_str)
+                min_bedrooms = apartments_dot_com_parsing.parse_bedrooms(min_bedrooms_str)
+                max_bedrooms = apartments_dot_com_parsing.parse_bedrooms(max_bedrooms_str)
             else:
-                min_bedrooms = max_bedrooms = cls._parse_bedrooms(bedrooms_str)
+                min_bedrooms = max_bedrooms = apartments_dot_com_parsing.parse_bedrooms(bedrooms_str)
 
             result = ApartmentsDotComSearchResult(
                 id=id,
@@ -379,277 +296,165 @@ class ApartmentsDotCom(scraper.Scraper):
 
 
     @classmethod
-    def scrape_search_results(cls, params: config.ScrapingParams) -> List[ApartmentsDotComSearchResult]:
-        '''Scrape search results from the search page.'''
-
-        def _is_search_result_element(tag: Tag) -> bool:
-            '''Helper for determining if tag is a search result element.'''
-            has_a_content_child = any(child.name == cls.SEARCH_RESULT_CHILD_ELEMENT_TYPE for child in tag.children)
-            return tag.name == cls.SEARCH_RESULT_ELEMENT_TYPE and \
-                tag.has_attr(cls.SEARCH_RESULT_ID_ATTRIBUTE) and \
-                has_a_content_child
+    def _find_search_result_elements(cls, soup: BeautifulSoup) -> List[Tag]:
+        '''Helper for finding search result elements.
+        
+        Name + attrs matching is handled natively by bs4, only the few candidates
+        it returns need the python-level content child check.
+        '''
+        candidates = soup.find_all(cls.SEARCH_RESULT_ELEMENT_TYPE, attrs={cls.SEARCH_RESULT_ID_ATTRIBUTE: True})
+        return [
+            tag for tag in candidates
+            if tag.find(cls.SEARCH_RESULT_CHILD_ELEMENT_TYPE, recursive=False) is not None
+        ]
 
-        # Search zipcodes one at a time
-        results = []
-        for zipcode in params.zipcodes:
-            glog.info(f'Finding search results for zipcode: {zipcode}')
-            current_page = 0  # Uses 1-based page numbers.
-            num_pages = None  # Will be set in loop.
-            continue_loop = True
-            search_results = []
-            while continue_loop:
-                current_page += 1
-                search_url = cls._get_search_url(params=params, zipcode=zipcode, page=current_page)
-                soup, logged_request = cls.get_url(search_url)
-
-                # Parse LD-JSON data blocks.
-                # Note: this provides no info over scraping the html so skipping.
-                # data_blocks = [json.loads(db.string) for db in soup.find_all('script', type=cls.DATA_BLOCK_TYPE)]
-                # data_block_search_results = cls._parse_apartment_complex_data_block(data_blocks[0]['about'])
-                # _ = data_blocks[1]  # Info about virtual tours, not useful.
-
-                # Parse info available in html.
-                search_result_elements = soup.find_all(_is_search_result_element)
-                new_results = []
-                for i, result_element in enumerate(search_result_elements):
-                    listing_id = None
-                    try:
-                        listing_id = result_element[cls.SEARCH_RESULT_ID_ATTRIBUTE]
-                        parsed_result = cls._parse_search_result_element(result_element, search_url=search_url)
-                        new_results.append(parsed_result)
-                    except scraper.KnownParsingError as e:
-                        glog.warning(f'Known error parsing search result element {listing_id}, skipping: {e}')
-                    except Exception as e:
-                        glog.warning(f'error parsing search result element ({search_url}, page: {current_page}, element: {i}, listing_id: {listing_id}), '
-                        f'skipping result: {traceback.format_exc()}')
-                    
-                if num_pages is None:
-                    num_pages = cls._parse_num_result_pages(soup) or cls.DEFAULT_NUM_PAGES
-                
-                # Store new results and add to logged_request response_info
-                logged_request.response_info[cls.SEARCH_REQUEST_PAGE_NUM_KEY] = current_page
-                logged_request.response_info[cls.SEARCH_REQUEST_NUM_RESULTS_KEY] = len(new_results)
-                cls._db_session.commit()
-                search_results += new_results
-                glog.info(f'Parsed {len(new_results)} new results from page {current_page} / {num_pages}, now {len(search_results)} total..')
-                
-                # Determine if search pagination loop should continue.
-                continue_loop = True
-                if len(new_results) == 0:
-                    continue_loop = False
-                    glog.warning(f'found 0 new results, ending search.')
-                elif len(search_results) > cls.MAX_SEARCH_RESULTS:
-                    continue_loop = False
-                    glog.warning(f'found {len(search_results)} search results, more than max allow results: {cls.MAX_SEARCH_RESULTS}... ending search.')
-                elif num_pages is not None and current_page >= num_pages:
-                    continue_loop = False
-                    glog.info(f'parsed all {current_page} / {num_pages} pages, ending search.')
-
-            # Filter out non-matches included in results.
-            filtered_searched_results = [
-                result for result in search_results
-                if result.min_price <= params.max_price and result.max_price >= params.min_price and \
-                    result.min_bedrooms <= params.max_bedrooms and result.max_bedrooms >= params.min_bedrooms and \
-                    result.address.zipcode == zipcode
-            ]
-            results += filtered_searched_results
 
-        return results
+    @classmethod
+    def _is_matching_search_result(cls, result: ApartmentsDotComSearchResult, params: config.ScrapingParams, zipcode: str) -> bool:
+        '''Check if search result overlaps scraping params, search pages also include non-matches.'''
+        return result.address.zipcode == zipcode and \
+            result.min_price <= params.max_price and result.max_price >= params.min_price and \
+            result.min_bedrooms <= params.max_bedrooms and result.max_bedrooms >= params.min_bedrooms
 
 
     @classmethod
-    def _parse_unit_type_html(cls, unit_type_html: Tag, full_page_html: Tag, building_address: Address, url: str) -> List[Listing]:
-        """Parse listings grid for given unit type.
+    def _scrape_zipcode_search_results(cls, params: config.ScrapingParams, zipcode: str,
+        results_queue: Optional[queue.Queue] = None) -> List[ApartmentsDotComSearchResult]:
+        '''Scrape all search result pages for a single zipcode.
         
-        'Unit Type' is single result box with fixed floor plan.
-        Each search result can have multiple, and each can have multiple listings at different prices.
-
-        Currently ignores available info that's not stored in Listing:
-        - images
-        - floorplan
-        - sq footage
-        - bathrooms
-        - available date
-        """
-
-        listings = []
-        unit_type_id = None
-        try:
-            unit_type_metadata_element = unit_type_html.find(class_=cls.UNIT_TYPE_METADATA_CONTAINER_CLASS)
-            unit_type_id = unit_type_metadata_element[cls.UNIT_TYPE_ID_ATTRIBUTE]
-
-            # Parse unit type metadata.
-            unit_type_metadata_str = unit_type_metadata_element.find(class_=cls.UNIT_TYPE_METADATA_CLASS).text
-            bedrooms_str, bathrooms_str, *sq_footage_strs = unit_type_metadata_str.split(',')
-            bedrooms = cls._parse_bedrooms(cls._sanitize_string(bedrooms_str))
-            bathrooms = cls._parse_bathrooms(cls._sanitize_string(bathrooms_str))
-            
-            # Parse building-wide metadata.
-            pets_allowed = None
-            try:
-                pets_allowed = cls._parse_pets_allowed(full_page_html.text)
-            except Exception as e:
-                glog.error(f'error parsing pets allowed, skipping parsing: {url}, unit_type_id: {unit_type_id}:\n{traceback.format_exc()}')
-
-            parking_available = None
-            try:
-                parking_available = cls._parse_parking_available(full_page_html.text)
-            except Exception as e:
-                glog.error(f'error parsing parking availability, skipping parsing: {url}, unit_type_id: {unit_type_id}:\n{traceback.format_exc()}')
-
-            # Parse listings.
-            listing_elements = unit_type_html.find_all(class_=cls.UNIT_TYPE_LISTINGS_CLASS)
-            for i, element in enumerate(listing_elements):
-                unit_num_str = element.find(class_=cls.LISTING_UNIT_NUM_CLASS).text
-                unit_num = cls._parse_unit_num(unit_num_str)
-                price_str = element.find(class_=cls.LISTING_PRICE_CLASS).text
-                price = cls._parse_price(price_str)
-
-                sqft = None
+        If results_queue is provided, matching results are also put on it as each page is parsed.
+        '''
+        glog.info(f'Finding search results for zipcode: {zipcode}')
+        db_session = cls._get_db_session()
+        current_page = 0  # Uses 1-based page numbers.
+        num_pages = None  # Will be set in loop.
+        continue_loop = True
+        search_results = []
+        num_parsed_results = 0  # Including non-matches, MAX_SEARCH_RESULTS cuts off on this like before filtering was moved in-loop.
+        while continue_loop:
+            current_page += 1
+            search_url = cls._get_search_url(params=params, zipcode=zipcode, page=current_page)
+            soup, logged_request = cls.get_url(search_url)
+
+            # Parse LD-JSON data blocks.
+            # Note: this provides no info over scraping the html so skipping.
+            # data_blocks = [utils.json_loads(db.string) for db in soup.find_all('script', type=cls.DATA_BLOCK_TYPE)]
+            # data_block_search_results = cls._parse_apartment_complex_data_block(data_blocks[0]['about'])
+            # _ = data_blocks[1]  # Info about virtual tours, not useful.
+
+            # Parse info available in html.
+            search_result_elements = cls._find_search_result_elements(soup)
+            new_results = []
+            for i, result_element in enumerate(search_result_elements):
+                listing_id = None
                 try:
-                    sqft_str = element.find(class_=cls.LISTING_SQFT_CLASS).text
-                    sqft_str = cls._sanitize_string(sqft_str)
-                    sqft = cls._parse_sqft(sqft_str)
+                    listing_id = result_element[cls.SEARCH_RESULT_ID_ATTRIBUTE]
+                    parsed_result = cls._parse_search_result_element(result_element, search_url=search_url)
+                    new_results.append(parsed_result)
+                except scraper.KnownParsingError as e:
+                    glog.warning(f'Known error parsing search result element {listing_id}, skipping: {e}')
                 except Exception as e:
-                    glog.error(f'error parsing sqft, skipping parsing: {url}, unit_type_id: {unit_type_id}, listing element: {i}:\n{traceback.format_exc()}')
-
-                address = Address(
-                    short_address=building_address.short_address,
-                    city=building_address.city,
-                    state=building_address.state,
-                    zipcode=building_address.zipcode,
-                    unit_num=unit_num
-                )
-                other_unit_info = {
-                    Unit.OTHER_INFO_SQFT_KEY: sqft,
-                    Unit.OTHER_INFO_PETS_ALLOWED_KEY: pets_allowed,
-                    Unit.OTHER_INFO_PARKING_AVAILABLE_KEY: parking_available,
-                }
-                unit = Unit(
-                    address=address,
-                    address_str=address.to_string(),
-                    zipcode=address.zipcode,
-                    bedrooms=bedrooms,
-                    bathrooms=bathrooms,
-                    other_info=other_unit_info
-                )
-                listing = Listing(
-                    unit=unit,
-                    price=price,
-                    url=url,
-                    source=cls.SOURCE
-                )
-                listings.append(listing)
-
-        except Exception as e:
-            exception_type = type(e)
-            raise exception_type(f'Error parsing listings from unit type {unit_type_id}: {e}') from e
+                    glog.warning(f'error parsing search result element ({search_url}, page: {current_page}, element: {i}, listing_id: {listing_id}), '
+                    f'skipping result: {traceback.format_exc()}')
+            
+            if num_pages is None:
+                num_pages = cls._parse_num_result_pages(soup) or cls.DEFAULT_NUM_PAGES
+        
+            # Store new results and add to logged_request response_info.
+            # Committed right away, leaving it dirty would have the next get_url() commit it anyway,
+            # after refreshing the expired request in a transaction held open through that fetch.
+            # Non-matches included in results (e.g. adjacent zipcodes) are dropped immediately.
+            logged_request.response_info[cls.SEARCH_REQUEST_PAGE_NUM_KEY] = current_page
+            logged_request.response_info[cls.SEARCH_REQUEST_NUM_RESULTS_KEY] = len(new_results)
+            db_session.commit()
+            matching_new_results = [
+                result for result in new_results
+                if cls._is_matching_search_result(result=result, params=params, zipcode=zipcode)
+            ]
+            num_parsed_results += len(new_results)
+            search_results += matching_new_results
+            if results_queue is not None:
+                for result in matching_new_results:
+                    results_queue.put(result)
+            glog.info(f'Parsed {len(new_results)} new results ({len(matching_new_results)} matching) from page {current_page} / {num_pages}, '
+                f'now {num_parsed_results} total ({len(search_results)} matching)..')
+        
+            # Determine if search pagination loop should continue.
+            continue_loop = True
+            if len(new_results) == 0:
+                continue_loop = False
+                glog.warning(f'found 0 new results, ending search.')
+            elif num_parsed_results > cls.MAX_SEARCH_RESULTS:
+                continue_loop = False
+                glog.warning(f'found {num_parsed_results} search results, more than max allow results: {cls.MAX_SEARCH_RESULTS}... ending search.')
+            elif num_pages is not None and current_page >= num_pages:
+                continue_loop = False
+                glog.info(f'parsed all {current_page} / {num_pages} pages, ending search.')
 
-        return listings
+        return search_results
 
 
     @classmethod
-    def _parse_multi_listing_search_result(cls, page_soup: BeautifulSoup, building_address: scraper.Address, url: str) -> List[Listing]:
-        '''Parse all listings from a multi-listing search result page.'''
-        
-        all_results_tab_element = page_soup.find(attrs={cls.ALL_UNITS_TAB_ATTRIBUTE_NAME: cls.ALL_UNITS_TAB_ATTRIBUTE_VALUE})
-        unit_type_elements = all_results_tab_element.find_all(class_=cls.UNIT_TYPE_CLASS)
+    def scrape_search_results(cls, params: config.ScrapingParams) -> List[ApartmentsDotComSearchResult]:
+        '''Scrape search results from the search page.'''
+        return list(cls.iter_search_results(params=params))
 
-        listings = []
-        for unit_type in unit_type_elements:
-            unit_type_listings = cls._parse_unit_type_html(
-                unit_type_html=unit_type,
-                full_page_html=page_soup,
-                building_address=building_address,
-                url=url
-            )
-            listings += unit_type_listings
 
-        return listings
+    @classmethod
+    def iter_search_results(cls, params: config.ScrapingParams) -> Iterator[ApartmentsDotComSearchResult]:
+        '''Stream search results as each search page is parsed.'''
 
+        # Warm zipcode info cache before the zipcode threads start, lookups are serialized by get_zipcode_info().
+        for zipcode in params.zipcodes:
+            cls.get_zipcode_info(zipcode)
 
-    @classmethod
-    def _parse_single_listing_search_result(cls, page_soup: BeautifulSoup, url: str) -> Listing:
-        '''Parse Listing from single-listing search result page.'''
-        listing_content = page_soup.find(class_=cls.LISTING_FULL_CONTENT_CLASS)
-        
-        # Parse address.
-        address_heading = page_soup.find(class_=cls.LISTING_ADDRESS_HEADING_CLASS).text
-        address_subheading = page_soup.find(class_=cls.LISTING_ADDRESS_SUBHEADING_CLASS).text
-        neighborhood_element = page_soup.find(class_=cls.LISTING_NEIGHBORHOOD_CLASS)
-        neighborhood_str = neighborhood_element.text if neighborhood_element else ''
+        def scrape_zipcode(zipcode: str) -> None:
+            try:
+                cls._scrape_zipcode_search_results(params=params, zipcode=zipcode, results_queue=results_queue)
+            finally:
+                results_queue.put(_ZIPCODE_SEARCH_DONE)
 
-        address = None
-        try:
-            # First try heading + subheading - neighboorhood
-            address_str = ' '.join([address_heading, address_subheading]).replace(neighborhood_str, '')
-            address_str = cls._sanitize_string(address_str)
-            address = Address.from_full_address(address_str)
-        except usaddress.RepeatedLabelError as e:
-            # If that didn't work try just the subheading - neighborhood
-            address_str = address_subheading.replace(neighborhood_str, '')
-            address_str = cls._sanitize_string(address_str)
-            address = Address.from_full_address(address_str)
-        
-        listing_detail_elements = page_soup.find_all(class_=cls.LISTING_DETAILS_CELL_CLASS)
-
-        # Parse bedrooms.
-        bedrooms_detail_cell_element = next(filter(lambda element: cls.LISTING_DETAILS_CELL_LABEL_BEDROOMS in element.text, listing_detail_elements))
-        bedrooms_str = bedrooms_detail_cell_element.text.replace(cls.LISTING_DETAILS_CELL_LABEL_BEDROOMS, '')
-        bedrooms_str = cls._sanitize_string(bedrooms_str)
-        bedrooms = cls._parse_bedrooms(bedrooms_str)
-
-        # Parse price.
-        price_detail_cell_element = next(filter(lambda element: cls.LISTING_DETAILS_CELL_LABEL_PRICE in element.text, listing_detail_elements))
-        price_str = price_detail_cell_element.text.replace(cls.LISTING_DETAILS_CELL_LABEL_PRICE, '')
-        price_str = cls._sanitize_string(price_str)
-        price = cls._parse_price(price_str)
-
-        # Parse bathrooms.
-        bathrooms_detail_cell_element = next(filter(lambda element: cls.LISTING_DETAILS_CELL_LABEL_BATHROOMS in element.text, listing_detail_elements))
-        bathrooms_str = bathrooms_detail_cell_element.text.replace(cls.LISTING_DETAILS_CELL_LABEL_BATHROOMS, '')
-        bathrooms_str = cls._sanitize_string(bathrooms_str)
-        bathrooms = cls._parse_bathrooms(bathrooms_str)
-
-        # Parse square footage.
-        sqft = None
+        # Search zipcodes concurrently, each is an independent chain of paginated requests.
+        results_queue = queue.Queue()
+        executor = ThreadPoolExecutor(max_workers=cls.MAX_ZIPCODE_WORKERS)
         try:
-            sqft_detail_cell_element = next(filter(lambda element: cls.LISTING_DETAILS_CELL_LABEL_SQFT in element.text, listing_detail_elements))
-            sqft_str = sqft_detail_cell_element.text.replace(cls.LISTING_DETAILS_CELL_LABEL_SQFT, '')
-            sqft_str = cls._sanitize_string(sqft_str)
-            sqft = cls._parse_sqft(sqft_str)
-        except Exception as e:
-            glog.error(f'error parsing square footage, skipping parsing: {url}:\n{traceback.format_exc()}')
+            futures = [executor.submit(scrape_zipcode, zipcode) for zipcode in params.zipcodes]
+            num_searching = len(futures)
+            while num_searching > 0:
+                result = results_queue.get()
+                if result is _ZIPCODE_SEARCH_DONE:
+                    num_searching -= 1
+                else:
+                    yield result
+            
+            # Re-raise any zipcode search errors.
+            for future in futures:
+                future.result()
+        finally:
+            # Drops queued zipcode searches if the caller stops iterating early, in-progress ones still finish.
+            executor.shutdown(cancel_futures=True)
 
-        # Parse other metadata
-        pets_allowed = None
-        try:
-            pets_allowed = cls._parse_pets_allowed(listing_content.text)
-        except Exception as e:
-            glog.error(f'error parsing pets allowed, skipping parsing: {url}:\n{traceback.format_exc()}')
-        
-        parking_available = None
-        try:
-            parking_available = cls._parse_parking_available(listing_content.text)
-        except Exception as e:
-            glog.error(f'error parsing parking availability, skipping parsing: {url}:\n{traceback.format_exc()}')
 
+    @classmethod
+    def _to_listing(cls, parsed_listing: apartments_dot_com_parsing.ParsedListing, url: str) -> Listing:
+        '''Build Listing (and its Unit) from a parsed listing, ORM objects are only created in this process.'''
+        address = parsed_listing.address
         other_unit_info = {
-            Unit.OTHER_INFO_SQFT_KEY: sqft,
-            Unit.OTHER_INFO_PETS_ALLOWED_KEY: pets_allowed,
-            Unit.OTHER_INFO_PARKING_AVAILABLE_KEY: parking_available,
+            Unit.OTHER_INFO_SQFT_KEY: parsed_listing.sqft,
+            Unit.OTHER_INFO_PETS_ALLOWED_KEY: parsed_listing.pets_allowed,
+            Unit.OTHER_INFO_PARKING_AVAILABLE_KEY: parsed_listing.parking_available,
         }
         unit = Unit(
             address=address,
             address_str=address.to_string(),
             zipcode=address.zipcode,
-            bedrooms=bedrooms,
-            bathrooms=bathrooms,
-            other_info=other_unit_info,
+            bedrooms=parsed_listing.bedrooms,
+            bathrooms=parsed_listing.bathrooms,
+            other_info=other_unit_info
         )
         return Listing(
             unit=unit,
-            price=price,
+            price=parsed_listing.price,
             url=url,
             source=cls.SOURCE
         )
@@ -661,18 +466,12 @@ class ApartmentsDotCom(scraper.Scraper):
         
         listings = []
         try:
-            soup, _ = cls.get_url(search_result.url)
-
-            all_results_tab_element = soup.find(attrs={cls.ALL_UNITS_TAB_ATTRIBUTE_NAME: cls.ALL_UNITS_TAB_ATTRIBUTE_VALUE})
-            multi_unit = all_results_tab_element is not None
-
-            # Parse search results with multiple units.
-            if multi_unit:
-                listings += cls._parse_multi_listing_search_result(page_soup=soup, building_address=search_result.address, url=search_result.url)
-
-            # Parse simple, single-listing search results.
-            else:
-                listings += [cls._parse_single_listing_search_result(page_soup=soup, url=search_result.url)]
+            # Fetch here but parse via _run_parse(), which can move the CPU-bound parsing off this thread's GIL.
+            # Only plain data crosses the process boundary, search results and ORM objects stay in this process.
+            response, _ = cls.get_url(search_result.url, parser=cls.PARSER_RAW)
+            parsed_listings = cls._run_parse(apartments_dot_com_parsing.parse_listings_page, response.content,
+                cls.declared_encoding(response), search_result.address, search_result.url, cls.HTML_PARSER)
+            listings = [cls._to_listing(parsed_listing, url=search_result.url) for parsed_listing in parsed_listings]
 
             # Filter to only valid listings.
             listings = [l for l in listings if cls.is_valid_listing(listing=l, params=scraping_params)]
@@ -0,0 +1,392 @@
+'''Apartments.com page parsing, shared by the scraper and its parse worker processes.
+
+Like parsing.py, must stay free of import-time side effects. Listing pages are parsed into plain
+ParsedListings rather than ORM objects, the scraper builds Units and Listings from them.
+'''
+
+from dataclasses import dataclass
+from typing import List, Optional
+import re
+import traceback
+
+from bs4 import BeautifulSoup, Tag
+import glog
+import usaddress
+
+from housing.configs import config
+from housing.data.address import Address
+from housing.scrapers import parsing
+
+NEVER_MATCH_REGEX = '(?!)'
+
+
+def _phrases_regex(phrases: List[str]) -> re.Pattern:
+    '''Compile phrases into a single alternation regex so text is scanned once for all of them.'''
+    if not phrases:
+        # An empty alternation would match everything.
+        return re.compile(NEVER_MATCH_REGEX)
+    return re.compile('|'.join(re.escape(phrase) for phrase in phrases))
+
+
+# Value parsing params.
+UNPARSEABLE_PRICE_STRS = ['callforrent']
+PRICE_DELETE_TABLE = str.maketrans('', '', '$, \n\r\t')  # Single chars stripped from price strings in one pass.
+PRICE_LABELS = ['price', '/mo']
+PRICE_REGEX = re.compile(r'[0-9]+')  # Full match only, ranges with other dashes (e.g. en dash) or '1.5k' must not parse.
+DIGITS_REGEX = re.compile(r'\d[\d,]*')  # Comma-grouped integer, e.g. 1,250
+
+# Listing parsing params: multi-listing pages.
+ALL_UNITS_TAB_ATTRIBUTE_NAME = 'data-tab-content-id'
+ALL_UNITS_TAB_ATTRIBUTE_VALUE = 'all'
+UNIT_TYPE_CLASS = 'hasUnitGrid'
+UNIT_TYPE_METADATA_CONTAINER_CLASS = 'priceGridModelWrapper'
+UNIT_TYPE_ID_ATTRIBUTE = 'data-rentalkey'
+UNIT_TYPE_METADATA_CLASS = 'detailsTextWrapper'
+UNIT_TYPE_LISTINGS_CLASS = 'unitContainer'
+
+# Listing parsing params: single-listing pages.
+LISTING_FULL_CONTENT_CLASS = 'profileContent'
+LISTING_ADDRESS_HEADING_CLASS = 'propertyNameRow'
+LISTING_ADDRESS_SUBHEADING_CLASS = 'propertyAddressRow'
+LISTING_NEIGHBORHOOD_CLASS = 'neighborhoodAddress'
+LISTING_DETAILS_CELL_CLASS = 'priceBedRangeInfoInnerContainer'
+LISTING_DETAILS_CELL_LABEL_PRICE = 'Monthly Rent'
+LISTING_DETAILS_CELL_LABEL_BEDROOMS = 'Bedrooms'
+LISTING_DETAILS_CELL_LABEL_BATHROOMS = 'Bathrooms'
+LISTING_DETAILS_CELL_LABEL_SQFT = 'Square Feet'
+LISTING_DETAILS_CELL_LABELS = (
+    LISTING_DETAILS_CELL_LABEL_PRICE,
+    LISTING_DETAILS_CELL_LABEL_BEDROOMS,
+    LISTING_DETAILS_CELL_LABEL_BATHROOMS,
+    LISTING_DETAILS_CELL_LABEL_SQFT,
+)
+
+# Listing parsing params: generic.
+LISTING_UNIT_NUM_CLASS = 'unitColumn'
+LISTING_PRICE_CLASS = 'pricingColumn'
+LISTING_SQFT_CLASS = 'sqftColumn'
+LISTING_YES_PETS_PHRASES = ['pet friendly']
+LISTING_NO_PETS_PHRASES = ['no pets']
+LISTING_YES_PARKING_PHRASES = [
+    'parking included',
+    'assigned parking',
+    'unassigned parking',
+    'parking available'
+]
+LISTING_NO_PARKING_PHRASES = []
+LISTING_YES_PETS_REGEX = _phrases_regex(LISTING_YES_PETS_PHRASES)
+LISTING_NO_PETS_REGEX = _phrases_regex(LISTING_NO_PETS_PHRASES)
+LISTING_YES_PARKING_REGEX = _phrases_regex(LISTING_YES_PARKING_PHRASES)
+LISTING_NO_PARKING_REGEX = _phrases_regex(LISTING_NO_PARKING_PHRASES)
+
+
+@dataclass(frozen=True, slots=True)
+class ParsedListing:
+    '''Listing parsed from a listing page, plain data so parse worker processes can return it.'''
+    address: Address
+    bedrooms: config.BedroomCount
+    bathrooms: float
+    price: int
+    sqft: Optional[int]
+    pets_allowed: Optional[bool]
+    parking_available: Optional[bool]
+
+
+def sanitize_string(input: str) -> str:
+    '''Remove any newlines, consecutive spaces, etc.'''
+    return ' '.join(input.split())  # Collapses newlines, tabs & consecutive spaces in one pass.
+
+
+def parse_bedrooms(bedrooms_str: str) -> config.BedroomCount:
+    """Parse the number of bedrooms from a formatted string."""
+
+    assert '-' not in bedrooms_str, 'Found "-", must split string before passing to parse_bedrooms()'
+
+    bedrooms_str = bedrooms_str.lower()
+    bedrooms_str = re.sub('b(e)?d(s)?', '', bedrooms_str)
+    bedrooms_str = bedrooms_str.replace(' ', '')
+    bedrooms_str = bedrooms_str.split(',')[0]
+    bedrooms_str = bedrooms_str.replace('studio', '0')
+
+    return int(bedrooms_str)
+
+
+def parse_bathrooms(bathrooms_str: str) -> float:
+    """Helper for parsing number of bathrooms from apartments.com formatted string."""
+    assert '-' not in bathrooms_str, 'Found "-", must split string before passing to parse_bathrooms()'
+
+    bathrooms_str = re.sub('ba(th)?(s)?', '', bathrooms_str)
+
+    return float(bathrooms_str)
+
+
+def parse_sqft(sqft_str: str) -> Optional[int]:
+    """Helper for parsing square footage from apartments.com formatted string."""
+    assert '-' not in sqft_str, 'Found "-", must split string before passing to parse_sqft()'
+
+    # Surrounding labels (e.g. 'sq ft', screenreader-only 'square feet') are skipped by the digits regex.
+    match = DIGITS_REGEX.search(sqft_str)
+
+    result = None
+    if match is not None:
+        result = int(match.group(0).replace(',', ''))
+
+    return result
+
+
+def parse_pets_allowed(input_text_lower: str) -> Optional[bool]:
+    """Helper for attempting to parse pet policy from apartments.com listing text.
+
+    Expects already-lowercased text so page text can be lowered once and shared across helpers.
+
+    Return: true/false if policy found, None otherwise
+    """
+    result = None
+    if LISTING_YES_PETS_REGEX.search(input_text_lower):
+        result = True
+    elif LISTING_NO_PETS_REGEX.search(input_text_lower):
+        result = False
+
+    return result
+
+
+def parse_parking_available(input_text_lower: str) -> Optional[bool]:
+    """Helper for attempting to parse parking availability from apartments.com listing text.
+
+    Expects already-lowercased text, see parse_pets_allowed().
+
+    Return: true/false if parking availability found, None otherwise
+    """
+    result = None
+    if LISTING_YES_PARKING_REGEX.search(input_text_lower):
+        result = True
+    elif LISTING_NO_PARKING_REGEX.search(input_text_lower):
+        result = False
+
+    return result
+
+
+def parse_price(price_str: str) -> int:
+    """Parse price from a formmatted string."""
+
+    assert '-' not in price_str, 'Found "-", must split string before passing to parse_price()'
+
+    # Labels removed, then single chars deleted in one translate pass.
+    price_str = price_str.lower()
+    for label in PRICE_LABELS:
+        price_str = price_str.replace(label, '')
+    price_str = price_str.translate(PRICE_DELETE_TABLE)
+
+    if price_str in UNPARSEABLE_PRICE_STRS:
+        raise parsing.KnownParsingError(f'unparseable price string: {price_str}')
+
+    # Anything left besides one run of digits is an unknown format, skip the listing rather than guess a price.
+    if PRICE_REGEX.fullmatch(price_str) is None:
+        raise parsing.KnownParsingError(f'unparseable price string: {price_str}')
+
+    return int(price_str)
+
+
+def parse_unit_num(unit_num_str: str) -> str:
+    """Parse unit_num from a formmated string."""
+
+    return unit_num_str.lower().replace('unit', '').strip()
+
+
+def _parse_unit_type_html(unit_type_html: Tag, page_text_lower: str, building_address: Address, url: str) -> List[ParsedListing]:
+    """Parse listings grid for given unit type.
+
+    'Unit Type' is single result box with fixed floor plan.
+    Each search result can have multiple, and each can have multiple listings at different prices.
+
+    page_text_lower is the lowercased text of the full page, computed once per page by the caller
+    since building-wide metadata is parsed from it for every unit type.
+
+    Currently ignores available info that's not stored in Listing:
+    - images
+    - floorplan
+    - sq footage
+    - bathrooms
+    - available date
+    """
+
+    listings = []
+    unit_type_id = None
+    try:
+        unit_type_metadata_element = unit_type_html.find(class_=UNIT_TYPE_METADATA_CONTAINER_CLASS)
+        unit_type_id = unit_type_metadata_element[UNIT_TYPE_ID_ATTRIBUTE]
+
+        # Parse unit type metadata.
+        unit_type_metadata_str = unit_type_metadata_element.find(class_=UNIT_TYPE_METADATA_CLASS).text
+        bedrooms_str, bathrooms_str, *sq_footage_strs = unit_type_metadata_str.split(',')
+        bedrooms = parse_bedrooms(sanitize_string(bedrooms_str))
+        bathrooms = parse_bathrooms(sanitize_string(bathrooms_str))
+
+        # Parse building-wide metadata.
+        pets_allowed = None
+        try:
+            pets_allowed = parse_pets_allowed(page_text_lower)
+        except Exception as e:
+            glog.error(f'error parsing pets allowed, skipping parsing: {url}, unit_type_id: {unit_type_id}:\n{traceback.format_exc()}')
+
+        parking_available = None
+        try:
+            parking_available = parse_parking_available(page_text_lower)
+        except Exception as e:
+            glog.error(f'error parsing parking availability, skipping parsing: {url}, unit_type_id: {unit_type_id}:\n{traceback.format_exc()}')
+
+        # Parse listings.
+        listing_elements = unit_type_html.find_all(class_=UNIT_TYPE_LISTINGS_CLASS)
+        for i, element in enumerate(listing_elements):
+            unit_num_str = element.find(class_=LISTING_UNIT_NUM_CLASS).text
+            unit_num = parse_unit_num(unit_num_str)
+            price_str = element.find(class_=LISTING_PRICE_CLASS).text
+            price = parse_price(price_str)
+
+            sqft = None
+            try:
+                sqft_str = element.find(class_=LISTING_SQFT_CLASS).text
+                sqft = parse_sqft(sqft_str)
+            except Exception as e:
+                glog.error(f'error parsing sqft, skipping parsing: {url}, unit_type_id: {unit_type_id}, listing element: {i}:\n{traceback.format_exc()}')
+
+            address = Address(
+                short_address=building_address.short_address,
+                city=building_address.city,
+                state=building_address.state,
+                zipcode=building_address.zipcode,
+                unit_num=unit_num
+            )
+            listings.append(ParsedListing(
+                address=address,
+                bedrooms=bedrooms,
+                bathrooms=bathrooms,
+                price=price,
+                sqft=sqft,
+                pets_allowed=pets_allowed,
+                parking_available=parking_available
+            ))
+
+    except Exception as e:
+        exception_type = type(e)
+        raise exception_type(f'Error parsing listings from unit type {unit_type_id}: {e}') from e
+
+    return listings
+
+
+def _parse_multi_listing_page(page_soup: BeautifulSoup, all_results_tab_element: Tag, building_address: Address, url: str) -> List[ParsedListing]:
+    '''Parse all listings from a multi-listing search result page.'''
+
+    unit_type_elements = all_results_tab_element.find_all(class_=UNIT_TYPE_CLASS)
+
+    # Full page text is shared by all unit types, only serialize it once.
+    # Whitespace is collapsed since get_text(' ') doubles spaces around inline tags, e.g. 'pet <b>friendly</b>'.
+    page_text_lower = ' '.join(page_soup.get_text(' ').split()).lower()
+
+    listings = []
+    for unit_type in unit_type_elements:
+        unit_type_listings = _parse_unit_type_html(
+            unit_type_html=unit_type,
+            page_text_lower=page_text_lower,
+            building_address=building_address,
+            url=url
+        )
+        listings += unit_type_listings
+
+    return listings
+
+
+def _parse_single_listing_page(page_soup: BeautifulSoup, url: str) -> ParsedListing:
+    '''Parse listing from single-listing search result page.'''
+    listing_content = page_soup.find(class_=LISTING_FULL_CONTENT_CLASS)
+    # Shared by metadata helpers below, missing content just leaves that metadata unparsed.
+    # Whitespace is collapsed so inline tags don't break phrase matches, see _parse_multi_listing_page().
+    listing_text_lower = ' '.join(listing_content.get_text(' ').split()).lower() if listing_content is not None else ''
+
+    # Parse address.
+    address_heading = page_soup.find(class_=LISTING_ADDRESS_HEADING_CLASS).text
+    address_subheading = page_soup.find(class_=LISTING_ADDRESS_SUBHEADING_CLASS).text
+    neighborhood_element = page_soup.find(class_=LISTING_NEIGHBORHOOD_CLASS)
+    neighborhood_str = neighborhood_element.text if neighborhood_element else ''
+
+    address = None
+    try:
+        # First try heading + subheading - neighboorhood
+        address_str = ' '.join([address_heading, address_subheading]).replace(neighborhood_str, '')
+        address_str = sanitize_string(address_str)
+        address = Address.from_full_address(address_str)
+    except usaddress.RepeatedLabelError as e:
+        # If that didn't work try just the subheading - neighborhood
+        address_str = address_subheading.replace(neighborhood_str, '')
+        address_str = sanitize_string(address_str)
+        address = Address.from_full_address(address_str)
+
+    # Index detail cell text by label in one pass, serializing each cell only once.
+    # First cell containing a label wins.
+    detail_cell_text_by_label = {}
+    for element in page_soup.find_all(class_=LISTING_DETAILS_CELL_CLASS):
+        element_text = element.text
+        for label in LISTING_DETAILS_CELL_LABELS:
+            if label in element_text:
+                detail_cell_text_by_label.setdefault(label, element_text)
+
+    # Parse bedrooms.
+    bedrooms_str = detail_cell_text_by_label[LISTING_DETAILS_CELL_LABEL_BEDROOMS].replace(LISTING_DETAILS_CELL_LABEL_BEDROOMS, '')
+    bedrooms_str = sanitize_string(bedrooms_str)
+    bedrooms = parse_bedrooms(bedrooms_str)
+
+    # Parse price.
+    price_str = detail_cell_text_by_label[LISTING_DETAILS_CELL_LABEL_PRICE].replace(LISTING_DETAILS_CELL_LABEL_PRICE, '')
+    price = parse_price(price_str)
+
+    # Parse bathrooms.
+    bathrooms_str = detail_cell_text_by_label[LISTING_DETAILS_CELL_LABEL_BATHROOMS].replace(LISTING_DETAILS_CELL_LABEL_BATHROOMS, '')
+    bathrooms_str = sanitize_string(bathrooms_str)
+    bathrooms = parse_bathrooms(bathrooms_str)
+
+    # Parse square footage.
+    sqft = None
+    try:
+        sqft_str = detail_cell_text_by_label[LISTING_DETAILS_CELL_LABEL_SQFT].replace(LISTING_DETAILS_CELL_LABEL_SQFT, '')
+        sqft = parse_sqft(sqft_str)
+    except Exception as e:
+        glog.error(f'error parsing square footage, skipping parsing: {url}:\n{traceback.format_exc()}')
+
+    # Parse other metadata
+    pets_allowed = None
+    try:
+        pets_allowed = parse_pets_allowed(listing_text_lower)
+    except Exception as e:
+        glog.error(f'error parsing pets allowed, skipping parsing: {url}:\n{traceback.format_exc()}')
+
+    parking_available = None
+    try:
+        parking_available = parse_parking_available(listing_text_lower)
+    except Exception as e:
+        glog.error(f'error parsing parking availability, skipping parsing: {url}:\n{traceback.format_exc()}')
+
+    return ParsedListing(
+        address=address,
+        bedrooms=bedrooms,
+        bathrooms=bathrooms,
+        price=price,
+        sqft=sqft,
+        pets_allowed=pets_allowed,
+        parking_available=parking_available
+    )
+
+
+def parse_listings_page(content: bytes, declared_encoding: Optional[str], building_address: Address, url: str,
+    html_parser: str = parsing.HTML_PARSER) -> List[ParsedListing]:
+    '''Parse all listings from a search result's page, run in a parse worker process if --parse_processes is set.'''
+    soup = parsing.parse_html(content, declared_encoding=declared_encoding, html_parser=html_parser)
+
+    all_results_tab_element = soup.find(attrs={ALL_UNITS_TAB_ATTRIBUTE_NAME: ALL_UNITS_TAB_ATTRIBUTE_VALUE})
+
+    # Parse search results with multiple units.
+    if all_results_tab_element is not None:
+        return _parse_multi_listing_page(page_soup=soup, all_results_tab_element=all_results_tab_element,
+            building_address=building_address, url=url)
+
+    # Parse simple, single-listing search results.
+    return [_parse_single_listing_page(page_soup=soup, url=url)]
@@ -0,0 +1,23 @@
+'''Parsing shared by scrapers and their parse worker processes.
+
+Must stay free of import-time side effects (flag parsing, DB / HTTP clients), --parse_processes workers import
+parse functions' modules and everything they import.
+'''
+
+from typing import Optional
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+HTML_PARSER = 'lxml'  # C parser, much faster than bs4's pure python 'html.parser'.
+
+
+class KnownParsingError(Exception):
+    '''Custom exception for known parsing errors that should be minimally logged.'''
+    pass
+
+
+def parse_html(content: bytes, declared_encoding: Optional[str] = None, strainer: Optional[SoupStrainer] = None,
+    html_parser: str = HTML_PARSER) -> BeautifulSoup:
+    '''Parse raw HTML into a soup.'''
+    # Pass raw bytes to skip bs4's encoding detection when the server declares a charset.
+    return BeautifulSoup(content, html_parser, from_encoding=declared_encoding, parse_only=strainer)
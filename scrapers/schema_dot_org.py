@@ -1,17 +1,18 @@
 '''Utils for parsing schema.org objects.'''
 
 from typing import Dict
+from operator import itemgetter
 
 from housing.data.address import Address
 from housing.scrapers import scraper
 
+# Fetches all PostalAddress fields in a single C-level call.
+POSTAL_ADDRESS_FIELDS_GETTER = itemgetter('streetAddress', 'addressLocality', 'addressRegion', 'postalCode')
+
 
 def parse_postal_address(postal_address: Dict) -> Address:
     '''Parse schema.org PostalAddress into a Address'''
-    short_address = postal_address['streetAddress']
-    city = postal_address['addressLocality']
-    state = postal_address['addressRegion']
-    zipcode = postal_address['postalCode']
+    short_address, city, state, zipcode = POSTAL_ADDRESS_FIELDS_GETTER(postal_address)
 
     return Address(
         short_address=short_address,
@@ -25,7 +26,7 @@ def parse_apartment_complex(apartment_complex: Dict) -> scraper.SearchResult:
     '''Parse schema.org ApartmentComplex into a PartialListing'''
     address = parse_postal_address(apartment_complex['Address'])
     url = apartment_complex['url']
-    id = address.id()
+    id = address.id
     return scraper.SearchResult(
         id=id,
         url=url,
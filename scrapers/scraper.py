@@ -1,22 +1,37 @@
 '''Universal scraping interface.'''
 
 from functools import lru_cache
-from typing import NamedTuple, List, Dict, Tuple, Optional
+from dataclasses import dataclass, asdict
+from typing import List, Dict, Tuple, Optional, Union, Iterator, Callable, Any
 import argparse
 from urllib.parse import urlparse
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
 import random
+import threading
+import multiprocessing
+import atexit
 
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup, SoupStrainer
 import glog
+from sqlalchemy.orm import Session
+try:
+    import httpx  # Optional, only needed with --http2.
+except ImportError:
+    httpx = None
 
 import uszipcode
 
+from housing import utils
 from housing.configs import config
 from housing.data.address import Address
 from housing.data.schema import Listing, IpAddress, Request
 from housing.data.db_client import DbClient
+from housing.scrapers import parsing
+from housing.scrapers.parsing import KnownParsingError  # Re-exported, scrapers and callers catch scraper.KnownParsingError.
 
 parser = argparse.ArgumentParser()
 parser.add_argument('--max_search_results', default=10, required=True, type=int,
@@ -26,19 +41,66 @@ parser.add_argument('--max_scraped_search_results', default=None, type=int,
 parser.add_argument('--ip_description', default=None, 
     help='description of IP address, needed if IP hasn\'t been logged before.')
 parser.add_argument('--env', default=None, required=True, help='Env for logging requests')
+parser.add_argument('--max_concurrent_requests', default=8, type=int,
+    help='Max in-flight requests while fully scraping search results.')
+parser.add_argument('--max_concurrent_scrapes', default=4, type=int,
+    help='Max config/scraper combos scraped at once, each with its own request concurrency.')
+parser.add_argument('--http2', action='store_true',
+    help='Multiplex requests over HTTP/2 connections, requires httpx[http2].')
+parser.add_argument('--parse_processes', default=0, type=int,
+    help='Processes to parse listing pages in, 0 parses in the scraping threads.')
+parser.add_argument('--config', action='append', default=None, dest='config_paths',
+    help='Config file to scrape, repeatable. Only used by scripts that scrape configs.')
 FLAGS = parser.parse_args()
 
+# Shared HTTP client returned by Scraper._get_http_session(), type depends on --http2.
+HttpSession = Union[requests.Session, 'httpx.Client']
 
-class KnownParsingError(Exception):
-    '''Custom exception for known parsing errors that should be minimally logged.'''
-    pass
 
-class SearchResult(NamedTuple):
+def _build_http_session(pool_size: int) -> requests.Session:
+    '''Build HTTP session with keep-alive connection pooling and retries on connection errors.
+
+    requests.Session's connection pool is thread-safe, so one session is shared by all scraping threads.
+    '''
+    http_session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        # Only connection failures are retried, each get_url() call logs one Request row with the final status,
+        # so retried reads or throttled (429/503) responses would be hidden from request logs and inflate latencies.
+        max_retries=Retry(total=3, connect=3, read=0, status=0, backoff_factor=0.3, respect_retry_after_header=False)
+    )
+    http_session.mount('http://', adapter)
+    http_session.mount('https://', adapter)
+    return http_session
+
+
+def _build_http2_client(pool_size: int) -> 'httpx.Client':
+    '''Build HTTP/2 client, concurrent requests to a host are multiplexed over one connection rather
+    than each needing its own TCP/TLS handshake.
+
+    Matches requests' defaults (following redirects, no timeout) so it's a drop-in for get_url().
+    Like requests.Session, httpx.Client is thread-safe.
+    '''
+    assert httpx is not None, 'httpx[http2] must be installed to use --http2'
+    transport = httpx.HTTPTransport(
+        http2=True,
+        retries=3,  # Only retries failed connections, like the requests adapter.
+        limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+    )
+    return httpx.Client(transport=transport, follow_redirects=True, timeout=None)
+
+
+@dataclass(frozen=True, slots=True)
+class SearchResult:
     '''Incomplete listing output from initial search that must be augmented with a specific search to convert to a Listing.'''
     id: str         # Site-specific unique ID for search result
     url: str        # Url to allow full scraping of the search result.
     address: Address
 
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
 
 class Scraper:
     '''Universal scraping interface.'''
@@ -48,17 +110,92 @@ class Scraper:
 
     MAX_SEARCH_RESULTS: int = FLAGS.max_search_results
     MAX_SCRAPED_SEARCH_RESULTS: Optional[int] = FLAGS.max_scraped_search_results
+
+    # Concurrency params, scraping is network-bound so threads overlap request latency.
+    MAX_ZIPCODE_WORKERS: int = 4
+    MAX_LISTING_WORKERS: int = FLAGS.max_concurrent_requests
+    # Listing scrapes submitted but not yet yielded, keeps workers busy without queueing every search result.
+    MAX_PENDING_LISTING_SCRAPES: int = 2 * MAX_LISTING_WORKERS
+    MAX_CONCURRENT_SCRAPES: int = FLAGS.max_concurrent_scrapes
+    # Each scraping thread holds its own DB session, so the pool needs a connection per thread of every concurrent scrape.
+    DB_POOL_SIZE: int = MAX_CONCURRENT_SCRAPES * (MAX_ZIPCODE_WORKERS + MAX_LISTING_WORKERS + 1)
+    HTTP_POOL_SIZE: int = 32
+    # HTML parsing is CPU-bound so threads serialize on the GIL, scrapers can hand it to a process pool instead.
+    PARSE_PROCESSES: int = FLAGS.parse_processes
+
+    HTML_PARSER = parsing.HTML_PARSER
+
+    # get_url() parser modes, None skips parsing and returns the response text.
+    PARSER_HTML = 'html'  # BeautifulSoup with HTML_PARSER.
+    PARSER_JSON = 'json'
+    PARSER_RAW = 'raw'  # The response itself, for callers that parse elsewhere (e.g. via _run_parse()).
     
     zipcode_client = uszipcode.SearchEngine()
-    db_client = DbClient()
-    _db_session = None
+    db_client = DbClient(pool_size=DB_POOL_SIZE)
+    _thread_local = threading.local()  # Per-thread state, DB sessions are not thread-safe.
+    _ip_lock = threading.Lock()
+    _zipcode_lock = threading.Lock()  # zipcode_client wraps a single DB session, which isn't thread-safe.
+    USE_HTTP2: bool = FLAGS.http2
+    _http_session = _build_http2_client(HTTP_POOL_SIZE) if USE_HTTP2 else _build_http_session(HTTP_POOL_SIZE)
+    _ip_address_id: Optional[int] = None  # Cached IpAddress row id, shared by all scrapers in this process.
+    _parse_executor: Optional[ProcessPoolExecutor] = None  # Created on first use, shared by all scrapers.
+    _parse_executor_lock = threading.Lock()
     my_ip = None
 
+    @classmethod
+    def _get_db_session(cls) -> Session:
+        '''Get this thread's DB session, reused across its requests so callers can batch commits.'''
+        if getattr(cls._thread_local, 'db_session', None) is None:
+            cls._thread_local.db_session = cls.db_client.session()
+        return cls._thread_local.db_session
+
+    @classmethod
+    def _get_http_session(cls) -> HttpSession:
+        '''Get the shared HTTP session, reused so connections are kept alive across requests and thread pools.'''
+        return cls._http_session
+
+    @classmethod
+    def _run_parse(cls, parse_fn: Callable, *args) -> Any:
+        '''Run a CPU-bound parse function, in the shared process pool if PARSE_PROCESSES is set.
+
+        parse_fn, args and its return value must be picklable when the process pool is used. Workers are spawned
+        and import parse_fn's module, so it must be a module-level function in a module without import-time
+        side effects (see parsing.py) taking and returning plain data, e.g. raw page content in, dataclasses out.
+        '''
+        if not cls.PARSE_PROCESSES:
+            return parse_fn(*args)
+        with Scraper._parse_executor_lock:
+            if Scraper._parse_executor is None:
+                # Spawn rather than fork, forking copies the scraping threads' held locks and open DB / HTTP connections.
+                Scraper._parse_executor = ProcessPoolExecutor(
+                    max_workers=cls.PARSE_PROCESSES, mp_context=multiprocessing.get_context('spawn'))
+                atexit.register(Scraper._parse_executor.shutdown)
+        return Scraper._parse_executor.submit(parse_fn, *args).result()
+
+    @classmethod
+    def parse_html(cls, content: bytes, declared_encoding: Optional[str] = None, strainer: Optional[SoupStrainer] = None) -> BeautifulSoup:
+        '''Parse raw HTML into a soup.'''
+        return parsing.parse_html(content, declared_encoding=declared_encoding, strainer=strainer, html_parser=cls.HTML_PARSER)
+
+    @staticmethod
+    def declared_encoding(response: Union[requests.Response, 'httpx.Response']) -> Optional[str]:
+        '''Charset declared by the server, if any.'''
+        return response.encoding if 'charset' in response.headers.get('content-type', '').lower() else None
+
     @classmethod
     def scrape_search_results(cls, params: config.ScrapingParams) -> List[SearchResult]:
         '''Scrape search results (format is source-specific) for a given ScrapingParams.'''
         raise NotImplementedError(f'must be overridden in {cls.__name__}')
 
+    @classmethod
+    def iter_search_results(cls, params: config.ScrapingParams) -> Iterator[SearchResult]:
+        '''Stream search results for a given ScrapingParams.
+
+        Scrapers that can yield results while still searching should override this so
+        search_and_scrape() can start scraping listings before the search finishes.
+        '''
+        yield from cls.scrape_search_results(params=params)
+
     @classmethod
     def scrape_listings(cls, search_result: SearchResult, scraping_params: config.ScrapingParams) -> List[Listing]:
         '''Fully scrape a single search result. Can return multiple listings.'''
@@ -67,60 +204,109 @@ class Scraper:
     @classmethod
     def search_and_scrape(cls, params: config.ScrapingParams) -> List[Listing]:
         '''Search given ScrapingParams and then fully scrape listings from each result.'''
+        return list(cls.search_and_scrape_iter(params=params))
+
+    @classmethod
+    def search_and_scrape_iter(cls, params: config.ScrapingParams) -> Iterator[Listing]:
+        '''Stream listings as they're scraped, so callers can record them while scraping continues.'''
         
-        search_results = cls.scrape_search_results(params=params)
         if cls.MAX_SCRAPED_SEARCH_RESULTS:
-            random.shuffle(search_results)
-            search_results = search_results[0:cls.MAX_SCRAPED_SEARCH_RESULTS]
-        glog.info(f'{cls.__name__} scraper gathered {len(search_results)} search results, now scraping listings from each..')
+            # Sampling needs every search result, so listings can't be scraped until the search finishes.
+            search_results = list(cls.iter_search_results(params=params))
+            if cls.MAX_SCRAPED_SEARCH_RESULTS < len(search_results):
+                search_results = random.sample(search_results, cls.MAX_SCRAPED_SEARCH_RESULTS)
+        else:
+            search_results = cls.iter_search_results(params=params)
+
+        num_listings = 0
+        pending_result_nums = {}
 
-        listings = []
-        for i, result in enumerate(search_results):
+        def finish_result(future) -> List[Listing]:
+            nonlocal num_listings
+            i = pending_result_nums.pop(future)
             try:
-                result_listings = cls.scrape_listings(search_result=result, scraping_params=params)
-                listings += result_listings
-                glog.info(f'..scraped result {i} / {len(search_results)}, found {len(result_listings)} new listings - now {len(listings)} total')
+                result_listings = future.result()
             except KnownParsingError as e:
                 glog.warning(f'Known error scraping listing for search result: {e}')
+                return []
+            num_listings += len(result_listings)
+            glog.info(f'..scraped result {i}, found {len(result_listings)} new listings - now {num_listings} total')
+            return result_listings
+
+        executor = ThreadPoolExecutor(max_workers=cls.MAX_LISTING_WORKERS)
+        try:
+            # Listings are scraped as search results arrive, overlapping search and listing requests.
+            num_results = 0
+            for i, result in enumerate(search_results):
+                pending_result_nums[executor.submit(cls.scrape_listings, search_result=result, scraping_params=params)] = i
+                num_results += 1
+                if len(pending_result_nums) >= cls.MAX_PENDING_LISTING_SCRAPES:
+                    done_futures, _ = wait(list(pending_result_nums), return_when=FIRST_COMPLETED)
+                else:
+                    done_futures = [future for future in pending_result_nums if future.done()]
+                for future in done_futures:
+                    yield from finish_result(future)
+            glog.info(f'{cls.__name__} scraper gathered {num_results} search results, finishing scraping listings from each..')
+
+            for future in as_completed(list(pending_result_nums)):
+                yield from finish_result(future)
+        finally:
+            # Drops queued scrapes if the caller stops iterating or a scrape fails, rather than finishing them unread.
+            executor.shutdown(cancel_futures=True)
         
-        glog.info(f'..{cls.__name__} scraper finished scraping all {len(search_results)} search results, found {len(listings)} listings.')
-        return listings
+        glog.info(f'..{cls.__name__} scraper finished scraping all {num_results} search results, found {num_listings} listings.')
 
 
     @classmethod
-    @lru_cache(maxsize=100)
     def get_zipcode_info(cls, zipcode: str) -> uszipcode.model.SimpleZipcode:
-        '''Get city, state info from a zipcode.'''
-        return cls.zipcode_client.by_zipcode(zipcode)
+        '''Get city, state info from a zipcode.
+
+        Locked around the cache too, so concurrent misses for a zipcode only query zipcode_client once.
+        '''
+        with Scraper._zipcode_lock:
+            return _get_zipcode_info(zipcode)
 
     @classmethod
-    def get_url(cls, url: str, method: str = 'GET', headers: Dict = None) -> Tuple[BeautifulSoup, Request]:
+    def get_url(cls, url: str, method: str = 'GET', headers: Dict = None,
+        parser: Optional[str] = PARSER_HTML, strainer: Optional[SoupStrainer] = None) -> Tuple[Union[BeautifulSoup, str, Dict, List], Request]:
         '''Download data from url.
+
+        Args:
+        - parser: PARSER_HTML, PARSER_JSON, PARSER_RAW or None. Callers that only need raw text or JSON
+            should avoid PARSER_HTML, building a parse tree is most of get_url()'s CPU time.
+        - strainer: only build the soup from matching tags, for callers needing a small part of the page.
         
         Return:
-        - soup
+        - soup, decoded JSON, response or response text depending on parser
         - logged Request object (to enable updating response_info downstream)
         '''
+        assert parser in (cls.PARSER_HTML, cls.PARSER_JSON, cls.PARSER_RAW, None), f'unrecognized parser: {parser}'
         
         if headers is None:
             headers = {}
 
         # Log request
-        cls._db_session = cls.db_client.session()  # Start a new session for this request.
-        if cls.my_ip is None:
-            cls.my_ip = IpAddress.my_ip()
-        ip_address_str = cls.my_ip
-        
-        ip_address = cls._db_session.query(IpAddress).filter(IpAddress.ip == ip_address_str).first()
-        if not ip_address:
-            if not FLAGS.ip_description:
-                raise ValueError(f'must provide --ip_description for unknown IP: {ip_address_str}')
-            ip_address = IpAddress(
-                ip=ip_address_str,
-                description=FLAGS.ip_description
-            )
-            cls._db_session.add(ip_address)
-            cls._db_session.flush()  # Need to flush to have id assigned
+        db_session = cls._get_db_session()
+        # Sessions are per-thread, but threads must not race to look up & insert the same IP.
+        # IP row id is cached after the first request so later requests skip the lookup entirely.
+        with cls._ip_lock:
+            if Scraper._ip_address_id is None:
+                if cls.my_ip is None:
+                    cls.my_ip = IpAddress.my_ip()
+                ip_address_str = cls.my_ip
+                
+                ip_address = db_session.query(IpAddress).filter(IpAddress.ip == ip_address_str).first()
+                if not ip_address:
+                    if not FLAGS.ip_description:
+                        raise ValueError(f'must provide --ip_description for unknown IP: {ip_address_str}')
+                    ip_address = IpAddress(
+                        ip=ip_address_str,
+                        description=FLAGS.ip_description
+                    )
+                    db_session.add(ip_address)
+                    db_session.commit()  # Commit (not just flush) so other threads' sessions find it.
+                Scraper._ip_address_id = ip_address.id
+        ip_address_id = Scraper._ip_address_id
         
         parsed_url = urlparse(url)
         env = FLAGS.env.lower()
@@ -128,32 +314,55 @@ class Scraper:
             'headers': headers
         }
         logged_request = Request(
-            ip=ip_address.id,
+            ip=ip_address_id,
             domain=parsed_url.hostname,
             method=method,
             endpoint=parsed_url.path,
             environment=env,
             request_info=request_info,
         )
-        logged_request.ip_id = ip_address.id
-        cls._db_session.add(logged_request)
-        cls._db_session.commit()
-        
-        response = requests.request(method, url, headers=headers)
-
+        logged_request.ip_id = ip_address_id
         logged_request.response_info = {}
-        logged_request.finished_at = datetime.utcnow()
-        logged_request.status_code = response.status_code
-        cls._db_session.commit()
+        # Row is only inserted once the request finishes (one commit per request), so can't rely on
+        # the created_at server default - set it explicitly for accurate latencies.
+        logged_request.created_at = datetime.utcnow()
+        
+        try:
+            response = cls._get_http_session().request(method, url, headers=headers)
+            logged_request.finished_at = datetime.utcnow()
+            logged_request.status_code = response.status_code
+        finally:
+            # Still log requests that failed without a response.
+            db_session.add(logged_request)
+            db_session.commit()
 
         response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        return soup, logged_request
+
+        if parser is None:
+            return response.text, logged_request
+        if parser == cls.PARSER_JSON:
+            return utils.json_loads(response.content), logged_request
+        if parser == cls.PARSER_RAW:
+            return response, logged_request
+
+        page = cls.parse_html(response.content, declared_encoding=cls.declared_encoding(response), strainer=strainer)
+        return page, logged_request
 
     @classmethod
     def is_valid_listing(cls, listing: Listing, params: config.ScrapingParams) -> bool:
-        '''Check if listing meets all scraping params.'''
-        return  params.min_price <= listing.price <= params.max_price and \
+        '''Check if listing meets all scraping params.
+
+        Ordered so the most selective check (zipcode, an O(1) frozenset lookup) short-circuits first.
+        '''
+        return listing.unit.address.zipcode in params.zipcodes and \
             params.min_bedrooms <= listing.unit.bedrooms <= params.max_bedrooms and \
-            listing.unit.address.zipcode in params.zipcodes
\ No newline at end of file
+            params.min_price <= listing.price <= params.max_price
+
+
+@lru_cache(maxsize=None)
+def _get_zipcode_info(zipcode: str) -> uszipcode.model.SimpleZipcode:
+    '''Cached zipcode lookup shared across all Scraper subclasses, keyed only on zipcode.
+
+    Unbounded since there are only ~42k US zipcodes, so a scrape never re-queries uszipcode's DB.
+    '''
+    return Scraper.zipcode_client.by_zipcode(zipcode)
\ No newline at end of file
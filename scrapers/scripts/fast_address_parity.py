@@ -0,0 +1,89 @@
+'''Check ApartmentsDotCom's fast-path address parsing matches usaddress.
+
+The fast path's short address becomes Unit.address_str, so any difference from Address.from_full_address()
+creates duplicate units for existing buildings. Re-run after changing FAST_ADDRESS_REGEX or its token sets.
+
+Checks SAMPLE_ADDRESS_STRS, plus every search card address on the first search page of each --config's zipcodes:
+
+python -u scrapers/scripts/fast_address_parity.py \
+    --env=dev \
+    --max_search_results=1000 \
+    --config=/Users/mark/Documents/housing/configs/seattle.yaml
+'''
+
+from typing import List, Optional
+
+import glog
+
+from housing.configs.config import Config
+from housing.data.address import Address
+from housing.scrapers.scraper import FLAGS
+from housing.scrapers.apartments_dot_com import ApartmentsDotCom
+
+SCRAPER = ApartmentsDotCom
+# Search card address strings, including formats the fast path must reject.
+SAMPLE_ADDRESS_STRS = [
+    '500 Pine St, Seattle, WA 98101',
+    '1521 2nd Ave, Seattle, WA 98101',
+    '4500 NE 45th St, Seattle, WA 98105',
+    '2200 Westlake Ave N, Seattle, WA 98109',
+    '4557 Union Bay Pl NE, Seattle, WA 98105',
+    '10 Mercer St, Mercer Island, WA 98040',
+    '1 Main St, Federal Way, WA 98003',
+    '12 Old Mill Rd, Seattle, WA 98101',
+    '123 St, Seattle, WA 98101',
+    '100 N St, Seattle, WA 98101',
+]
+
+
+def fetch_card_address_strs(config: Config) -> List[str]:
+    '''Address strings from the first search page of each of config's zipcodes, built like the scraper builds them.'''
+    address_strs = []
+    for zipcode in config.scraping_params.zipcodes:
+        search_url = SCRAPER._get_search_url(params=config.scraping_params, zipcode=zipcode, page=1)
+        soup, _ = SCRAPER.get_url(search_url)
+        for result_element in SCRAPER._find_search_result_elements(soup):
+            for classes_regex in (SCRAPER.SEARCH_RESULT_ADDRESS_CLASSES_REGEX, SCRAPER.SEARCH_RESULT_ADDRESS_CLASSES_FALLBACK_REGEX):
+                address_elements = result_element.find_all(class_=classes_regex)
+                if address_elements:
+                    address_strs.append(SCRAPER._join_address_elements(address_elements))
+    return address_strs
+
+
+def check_parity(address_str: str) -> Optional[str]:
+    '''Return: description of the mismatch, None if the fast path rejects address_str or agrees with usaddress.'''
+    fast_address = SCRAPER._fast_parse_address(address_str)
+    if fast_address is None:
+        return None
+
+    try:
+        address = Address.from_full_address(address_str)
+    except Exception as e:
+        return f'fast path accepted address usaddress rejects ({e})'
+    if fast_address.to_string() != address.to_string():
+        return f'fast path: {fast_address.to_string()}, usaddress: {address.to_string()}'
+    return None
+
+
+def main():
+    address_strs = list(SAMPLE_ADDRESS_STRS)
+    for config_path in FLAGS.config_paths or []:
+        address_strs += fetch_card_address_strs(Config.load_from_file(config_path))
+
+    num_fast_parsed = 0
+    mismatches = []
+    for address_str in address_strs:
+        if SCRAPER._fast_parse_address(address_str) is not None:
+            num_fast_parsed += 1
+        mismatch = check_parity(address_str)
+        if mismatch is not None:
+            mismatches.append(f'{address_str}: {mismatch}')
+
+    glog.info(f'fast path parsed {num_fast_parsed} / {len(address_strs)} address strings')
+    if mismatches:
+        raise ValueError(f'{len(mismatches)} fast path / usaddress mismatches:\n' + '\n'.join(mismatches))
+    glog.info('no mismatches found.')
+
+
+if __name__ == '__main__':
+    main()
@@ -9,7 +9,8 @@ TODO
 python scrapers/scripts/scrape_and_record.py \
     --env=dev \
     --max_search_results=500 \
-    --max_scraped_search_results=500
+    --max_scraped_search_results=500 \
+    --config=/Users/mark/Documents/housing/configs/seattle.yaml
 
 To see count of recent requests:
     select domain, count(*)
@@ -19,20 +20,25 @@ To see count of recent requests:
 '''
 
 from os import path
-import json
-from typing import NamedTuple, Dict, List
+from typing import Dict, List, Optional
+import logging
+from dataclasses import dataclass, asdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import glog
 import pandas as pd
+from sqlalchemy import insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import sessionmaker, Session
 
+from housing import utils
 from housing.configs.config import Config
 from housing.data.db_client import DbClient
-from housing.data.schema import Unit
+from housing.data.schema import Unit, Listing
 from housing.scrapers.apartments_dot_com import ApartmentsDotCom
-from housing.scrapers.scraper import Scraper
+from housing.scrapers.scraper import Scraper, FLAGS
 
-# Move these to args!
+# Default configs, if none are passed with --config.
 CONFIG_PATHS = [
     # '/Users/mark/Documents/housing/configs/dev.yaml'
     # '/Users/mark/Documents/housing/configs/scraper_load_test.yaml'
@@ -43,14 +49,21 @@ SCRAPERS = [
     ApartmentsDotCom
 ]
 
+UNIT_LOOKUP_CHUNK_SIZE = 5000  # Keeps each IN clause well under Postgres' bind parameter limit.
+INSERT_CHUNK_SIZE = 1000  # Rows per multi-row INSERT, also bounded by the bind parameter limit.
+MAX_CONCURRENT_SCRAPES = FLAGS.max_concurrent_scrapes  # Config/scraper combos scraped at once.
+RECORD_BATCH_SIZE = 100  # Scraped listings recorded per DB transaction.
 
-class SingleScrapeResult(NamedTuple):
+
+@dataclass(frozen=True, slots=True)
+class SingleScrapeResult:
     '''For storing metadata about a single scrape result.'''
     units: int
     listings: int
 
 
-class FullScrapeResult(NamedTuple):
+@dataclass(frozen=True, slots=True)
+class FullScrapeResult:
     '''Metadata about an entire scraping run'''
     # Counts of listings scraped by config then scraper
     listing_counts: Dict[str, Dict[str, int]]
@@ -60,70 +73,205 @@ class FullScrapeResult(NamedTuple):
         listings_summary_df = pd.DataFrame.from_dict(self.listing_counts)
         return listings_summary_df
 
+    def to_compact_str(self) -> str:
+        '''Formats as a single line of config/scraper=count pairs, much cheaper than to_table().'''
+        return ', '.join(
+            f'{config_name}/{scraper_name}={count}'
+            for config_name, scraper_counts in self.listing_counts.items()
+            for scraper_name, count in scraper_counts.items()
+        )
+
+
+def find_unit_ids_by_address_str(address_strs: List[str], db_session: Session) -> Dict[str, int]:
+    '''Find ids of already recorded units by address_str, in as few queries as possible.'''
+    found_unit_ids = {}
+    for chunk_start in range(0, len(address_strs), UNIT_LOOKUP_CHUNK_SIZE):
+        chunk = address_strs[chunk_start:chunk_start + UNIT_LOOKUP_CHUNK_SIZE]
+        rows = db_session.execute(select(Unit.id, Unit.address_str).where(Unit.address_str.in_(chunk)))
+        for unit_id, address_str in rows:
+            found_unit_ids[address_str] = unit_id
+    return found_unit_ids
+
+
+def load_all_unit_ids_by_address_str(db_session: Session) -> Dict[str, int]:
+    '''Load ids of every recorded unit by address_str, for long-running callers that re-scrape the same units.'''
+    rows = db_session.execute(select(Unit.id, Unit.address_str))
+    return {address_str: unit_id for unit_id, address_str in rows}
+
+
+def insert_units(units: List[Unit], db_session: Session) -> Dict[str, int]:
+    '''Bulk insert units with multi-row INSERT ... ON CONFLICT DO NOTHING RETURNING statements.
+
+    Units whose address_str is already recorded are skipped by the DB, so no existence check is needed.
+    Return: ids of newly inserted units by address_str.
+    '''
+    # Concurrent scrapes insert overlapping addresses, sorting makes every transaction lock
+    # unique index entries in the same order so they wait on each other instead of deadlocking.
+    units = sorted(units, key=lambda unit: unit.address_str)
+    inserted_unit_ids = {}
+    for chunk_start in range(0, len(units), INSERT_CHUNK_SIZE):
+        rows = [
+            {
+                'address_str': unit.address_str,
+                'zipcode': unit.zipcode,
+                'bedrooms': unit.bedrooms,
+                'bathrooms': unit.bathrooms,
+                'other_info': unit.other_info,
+            }
+            for unit in units[chunk_start:chunk_start + INSERT_CHUNK_SIZE]
+        ]
+        insert_stmt = pg_insert(Unit).values(rows).on_conflict_do_nothing(index_elements=['address_str'])
+        result = db_session.execute(insert_stmt.returning(Unit.id, Unit.address_str))
+        for unit_id, address_str in result:
+            inserted_unit_ids[address_str] = unit_id
+    return inserted_unit_ids
+
+
+def insert_listings(listings: List[Listing], unit_ids_by_address_str: Dict[str, int],
+    batch_unit_ids_by_address_str: Dict[str, int], db_session: Session) -> None:
+    '''Bulk insert listings with multi-row INSERT statements.
+
+    Unit ids are taken from batch_unit_ids_by_address_str (this transaction's units) first, then unit_ids_by_address_str.
+    '''
+    def unit_id(address_str: str) -> int:
+        if address_str in batch_unit_ids_by_address_str:
+            return batch_unit_ids_by_address_str[address_str]
+        return unit_ids_by_address_str[address_str]
+
+    for chunk_start in range(0, len(listings), INSERT_CHUNK_SIZE):
+        rows = [
+            {
+                'unit_id': unit_id(listing.unit.address_str),
+                'source': listing.source,
+                'price': listing.price,
+                'url': listing.url,
+            }
+            for listing in listings[chunk_start:chunk_start + INSERT_CHUNK_SIZE]
+        ]
+        db_session.execute(insert(Listing).values(rows))
+
+
+def record_listings(listings: List[Listing], unit_ids_by_address_str: Dict[str, int], db_session: Session) -> int:
+    '''Record a batch of scraped listings and their units in the DB.
+
+    unit_ids_by_address_str holds ids of committed units already known to this scrape, it's updated with the batch's
+    units once they're committed so buildings repeated across batches only hit the DB once. It may be shared with
+    concurrent scrapes, so uncommitted ids must never be added: other transactions can't see those units yet and
+    a rolled back batch would leave ids for units that don't exist.
 
-def scrape_and_record_one(config: Config, scraper: Scraper, db_session: Session) -> SingleScrapeResult:
+    Return: number of new units recorded.
+    '''
+    try:
+        # Dedupe units in-process first so each unknown address is only sent to the DB once.
+        # The DB skips already recorded units, which avoids a racy lookup-then-insert.
+        unknown_units_by_address_str = {}
+        for listing in listings:
+            if listing.unit.address_str not in unit_ids_by_address_str:
+                unknown_units_by_address_str.setdefault(listing.unit.address_str, listing.unit)
+        batch_unit_ids_by_address_str = insert_units(list(unknown_units_by_address_str.values()), db_session=db_session)
+        num_new_units = len(batch_unit_ids_by_address_str)
+
+        # Only units that already existed still need their ids looked up.
+        existing_address_strs = [address_str for address_str in unknown_units_by_address_str if address_str not in batch_unit_ids_by_address_str]
+        batch_unit_ids_by_address_str.update(find_unit_ids_by_address_str(existing_address_strs, db_session=db_session))
+
+        insert_listings(listings, unit_ids_by_address_str=unit_ids_by_address_str,
+            batch_unit_ids_by_address_str=batch_unit_ids_by_address_str, db_session=db_session)
+        db_session.commit()
+    except Exception as e:
+        db_session.rollback()
+        raise RuntimeError(f'error recording {len(listings)} scraped listings: {e}') from e
+    
+    unit_ids_by_address_str.update(batch_unit_ids_by_address_str)
+    return num_new_units
+
+
+def scrape_and_record_one(config: Config, scraper: Scraper, db_session: Session,
+    unit_ids_by_address_str: Optional[Dict[str, int]] = None) -> SingleScrapeResult:
     '''Scrape and record results in the DB for a given config/scraper combo.
+
+    Listings are recorded in batches while scraping continues, rather than all at once at the end.
+    Optionally pass known unit ids by address_str (e.g. from load_all_unit_ids_by_address_str()) so units
+    recorded before this scrape skip the DB entirely. It's updated with units recorded by this scrape.
     
     Return: metadata about successfully recorded results.
     '''
     scraping_params = config.scraping_params
-    scraped_listings = scraper.search_and_scrape(params=scraping_params)
+    if unit_ids_by_address_str is None:
+        unit_ids_by_address_str = {}
 
     new_units = 0
-    for i, listing in enumerate(scraped_listings):
-        try:
-            unit = listing.unit
-
-            # Check if unit already in db.
-            found_unit = db_session.query(Unit).filter(Unit.address_str == unit.address_str).first()
-            if found_unit:
-                unit = found_unit
-
-            # Otherwise add it.
-            else:
-                db_session.add(unit)
-                db_session.flush()  # Need to flush to have unit.id assigned
-                new_units += 1
-            
-            listing.unit_id = unit.id
-            db_session.add(listing)
-        except Exception as e:
-            raise RuntimeError(f'error recording scraped listing {i}/{len(scraped_listings)}: {json.dumps(listing.to_dict())}: {e}') from e
-    
-    db_session.commit()
-    return SingleScrapeResult(units=new_units, listings=len(scraped_listings))
+    num_listings = 0
+    batch = []
+    for listing in scraper.search_and_scrape_iter(params=scraping_params):
+        batch.append(listing)
+        if len(batch) >= RECORD_BATCH_SIZE:
+            new_units += record_listings(batch, unit_ids_by_address_str=unit_ids_by_address_str, db_session=db_session)
+            num_listings += len(batch)
+            batch = []
+    if batch:
+        new_units += record_listings(batch, unit_ids_by_address_str=unit_ids_by_address_str, db_session=db_session)
+        num_listings += len(batch)
+
+    return SingleScrapeResult(units=new_units, listings=num_listings)
 
 
-def scrape_and_record_all(configs: List[Config], scrapers: List[Scraper], db_session: Session) -> FullScrapeResult:
+def scrape_and_record_all(configs: List[Config], scrapers: List[Scraper], db_client: DbClient,
+    unit_ids_by_address_str: Optional[Dict[str, int]] = None) -> FullScrapeResult:
+    '''Scrape and record all config/scraper combos concurrently, each is almost entirely blocked on HTTP.
+
+    If passed, unit_ids_by_address_str is shared by all combos, see scrape_and_record_one().
+    '''
     glog.info(f'Attempting to scrape {len(configs)} scraper_configs across {len(scrapers)} sources...')
-    listing_counts = {}
-    for i, config in enumerate(configs):
-        listing_counts[config.name] = {}
-        
-        for j, scraper in enumerate(scrapers):
-            scrape_metadata = {"config": config.name, "scraper": scraper.__name__}
-            scrape_progress = f'config {i}/{len(configs)}, scraper {j}/{len(scrapers)}'
-            glog.info(f'Attempting scrape {scrape_progress}: {json.dumps(scrape_metadata)}')
-            
+
+    def scrape_and_record_one_in_own_session(config: Config, scraper: Scraper) -> SingleScrapeResult:
+        # Sessions are not thread-safe, so each combo gets its own.
+        db_session = db_client.session()
+        try:
+            return scrape_and_record_one(config=config, scraper=scraper, db_session=db_session,
+                unit_ids_by_address_str=unit_ids_by_address_str)
+        finally:
+            db_session.close()
+
+    debug_logging = logging.getLogger().isEnabledFor(logging.DEBUG)
+    listing_counts = {config.name: {} for config in configs}
+    finished_scrapes = []  # Summarized in a single log once all scrapes finish.
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_SCRAPES) as executor:
+        scrapes = {}
+        for i, config in enumerate(configs):
+            for j, scraper in enumerate(scrapers):
+                scrape_metadata = {"config": config.name, "scraper": scraper.__name__}
+                scrape_progress = f'config {i}/{len(configs)}, scraper {j}/{len(scrapers)}'
+                if debug_logging:
+                    glog.debug(f'Attempting scrape {scrape_progress}: {utils.json_dumps(scrape_metadata)}')
+                future = executor.submit(scrape_and_record_one_in_own_session, config=config, scraper=scraper)
+                scrapes[future] = (config, scraper, scrape_metadata, scrape_progress)
+
+        for future in as_completed(scrapes):
+            config, scraper, scrape_metadata, scrape_progress = scrapes[future]
             try:
-                scrape_result = scrape_and_record_one(config=config, scraper=scraper, db_session=db_session)
+                scrape_result = future.result()
                 
                 listing_counts[config.name][scraper.__name__] = scrape_result.listings
-                glog.info(f'..finished scrape {scrape_progress}: {json.dumps(scrape_metadata)}: {json.dumps(scrape_result._asdict())}')
+                finished_scrapes.append((scrape_progress, scrape_metadata, scrape_result))
             except Exception as e:
-                raise RuntimeError(f'Error with scrape {scrape_progress}: {json.dumps(scrape_metadata)}: {e}') from e
+                raise RuntimeError(f'Error with scrape {scrape_progress}: {utils.json_dumps(scrape_metadata)}: {e}') from e
     
+    glog.info(f'..finished {len(finished_scrapes)} scrapes:\n' + '\n'.join(
+        f'  {scrape_progress}: {utils.json_dumps(scrape_metadata)}: {utils.json_dumps(asdict(scrape_result))}'
+        for scrape_progress, scrape_metadata, scrape_result in finished_scrapes
+    ))
     return FullScrapeResult(listing_counts=listing_counts)
 
 
 def main():
-    db_client = DbClient()
-    db_session = db_client.session()
+    db_client = DbClient(pool_size=MAX_CONCURRENT_SCRAPES)
     
-    configs = [Config.load_from_file(config_path) for config_path in CONFIG_PATHS]
+    config_paths = FLAGS.config_paths or CONFIG_PATHS
+    configs = [Config.load_from_file(config_path) for config_path in config_paths]
 
-    full_scrape_results = scrape_and_record_all(configs=configs, scrapers=SCRAPERS, db_session=db_session)
-    glog.info(f'..finished scraping {len(CONFIG_PATHS)} scraper_configs across {len(SCRAPERS)} sources - scraped listings:\n{full_scrape_results.to_table()}')
+    full_scrape_results = scrape_and_record_all(configs=configs, scrapers=SCRAPERS, db_client=db_client)
+    glog.info(f'..finished scraping {len(configs)} scraper_configs across {len(SCRAPERS)} sources - scraped listings:\n{full_scrape_results.to_table()}')
 
 
 if __name__ == '__main__':
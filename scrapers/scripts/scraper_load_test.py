@@ -4,7 +4,10 @@ python -u scrapers/scripts/scraper_load_test.py \
     --env=load_test \
     --max_search_results=1000 \
     --max_scraped_search_results=500 \
-    --ip_description="madrone starbucks wifi"
+    --ip_description="madrone starbucks wifi" \
+    --max_concurrent_requests=16 \
+    --parse_processes=4 \
+    --http2 \
     2>&1 | tee ~/Downloads/housing_scraper_load_tests/apartment_dot_com_no_throttling.txt
 '''
 
@@ -22,32 +25,46 @@ SCRAPER = ApartmentsDotCom
 
 def main():
     db_client = DbClient()
-    db_session = db_client.session()
     
     config = Config.load_from_file(CONFIG_PATH)
 
+    # Loops re-scrape mostly the same units, so load known unit ids once and keep them updated across loops.
+    db_session = db_client.session()
+    try:
+        unit_ids_by_address_str = scrape_and_record.load_all_unit_ids_by_address_str(db_session)
+    finally:
+        db_session.close()
+    glog.info(f'Loaded {len(unit_ids_by_address_str)} known unit ids')
+
     loops = 0
+    last_loop_result = None
     start_time = datetime.now()
     glog.info(f'Attempting to scrape {SCRAPER.__name__} until failure...')
-    while True:
-        loop_start = datetime.now()
-        total_elapsed = round(loop_start.timestamp() - start_time.timestamp())
-        glog.info(f'Attempting loop {loops} {total_elapsed}s after start')
-
-        try:
-            loop_result = scrape_and_record.scrape_and_record_all(
-                configs=[config],
-                scrapers=[SCRAPER],
-                db_session=db_session,
-            )
-            total_elapsed = round(datetime.now().timestamp() - start_time.timestamp())
-            loop_elapsed = round(loop_start.timestamp() - start_time.timestamp())
-            glog.info(f'Finished loop {loops} after {loop_elapsed}s ({total_elapsed}s total), result:\n{loop_result.to_table()}')
-            loops += 1
-        except Exception as e:
-            total_elapsed = round(datetime.now().timestamp() - start_time.timestamp())
-            raise RuntimeError(f'scrape loop {loops} failed after {total_elapsed}s total') from e
+    try:
+        while True:
+            loop_start = datetime.now()
+            total_elapsed = round(loop_start.timestamp() - start_time.timestamp())
+            glog.info(f'Attempting loop {loops} {total_elapsed}s after start')
 
+            try:
+                loop_result = scrape_and_record.scrape_and_record_all(
+                    configs=[config],
+                    scrapers=[SCRAPER],
+                    db_client=db_client,
+                    unit_ids_by_address_str=unit_ids_by_address_str,
+                )
+                total_elapsed = round(datetime.now().timestamp() - start_time.timestamp())
+                loop_elapsed = round(loop_start.timestamp() - start_time.timestamp())
+                glog.info(f'Finished loop {loops} after {loop_elapsed}s ({total_elapsed}s total), result: {loop_result.to_compact_str()}')
+                last_loop_result = loop_result
+                loops += 1
+            except Exception as e:
+                total_elapsed = round(datetime.now().timestamp() - start_time.timestamp())
+                raise RuntimeError(f'scrape loop {loops} failed after {total_elapsed}s total') from e
+    finally:
+        # Summary table is only built once on exit (failure or interrupt), pandas is too slow to run every loop.
+        if last_loop_result is not None:
+            glog.info(f'Last finished loop result:\n{last_loop_result.to_table()}')
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
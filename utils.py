@@ -1,24 +1,59 @@
 '''Misc utils throughout the repo.'''
 
-from typing import Dict
+from typing import Dict, Any
+from functools import lru_cache
 from os import path
-import re
+import copy
+import os
 
 import yaml
+try:
+    import orjson  # Optional, much faster (de)serialization, e.g. for JSON responses and logging large objects.
+except ImportError:
+    orjson = None
+import json
+try:
+    from yaml import CSafeLoader as YamlSafeLoader  # libyaml C parser, only available if PyYAML was built with libyaml.
+except ImportError:
+    from yaml import SafeLoader as YamlSafeLoader
+
+YAML_EXTENSIONS = ('.yml', '.yaml')
+
+
+def json_dumps(obj: Any) -> str:
+    '''Serialize to a JSON string, with orjson if installed.'''
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj)
+
+
+def json_loads(data: Any) -> Any:
+    '''Deserialize a JSON str or bytes, with orjson if installed.'''
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
 
 def load_yaml(filepath: str) -> Dict:
     # Validate passed filepath.
     filepath_without_ext, ext = path.splitext(filepath)
-    assert re.search('^\.y(a)?ml', ext) is not None, \
-        f'Filepath must be yaml, found: {ext}: {filepath}'
+    assert ext in YAML_EXTENSIONS, f'Filepath must be yaml, found: {ext}: {filepath}'
     assert path.exists(filepath), f'File not found: {filepath}'
 
-    # Load yaml.
+    # Load yaml, keyed on mtime so edited files are re-read.
+    # Callers (e.g. Config.from_dict) mutate the result, so never hand out the cached object itself.
+    mtime_ns = os.stat(filepath).st_mtime_ns
+    return copy.deepcopy(_load_yaml(filepath, mtime_ns))
+
+
+@lru_cache(maxsize=32)
+def _load_yaml(filepath: str, mtime_ns: int) -> Dict:
+    '''Read and parse yaml file, cached by load_yaml().'''
     result = None
     with open(filepath, 'r') as file:
         try:
-            result = yaml.safe_load(file)
+            result = yaml.load(file, Loader=YamlSafeLoader)
         except Exception as e:
             raise ValueError(f'Error parsing yaml at {filepath}: {e}') from e
     
-    return result
\ No newline at end of file
+    return result